@@ -0,0 +1,137 @@
+import threading
+
+from Player import SearchCancelled
+
+
+class AiWorker:
+    """
+    Runs an Ai's choose_move in a background thread so the gui keeps handling
+    events while the Ai thinks. The event loop starts a move with start,
+    checks for it with poll, and calls cancel when the game is left. A Hard
+    Ai can also ponder its replies in the thread during the opponent's turn.
+
+    start and ponder wait for the search before them to stop, since it can
+    share the player with the new one, so a player's choose_move has to
+    raise SearchCancelled soon after request_stop is called, or finish
+    quickly like the Easy Ai, or the window stops responding while it runs.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._player = None
+        self._move = None
+        self._error = None
+        # a cancelled search can still be finishing, so results are only
+        # kept from the search with the current number
+        self._search = 0
+        # position being pondered, None when choosing a move or idle
+        self._pondering = None
+        self._lock = threading.Lock()
+
+    def start(self, player, *args):
+        """
+        Starts choosing a move for player, cancelling any search running and
+        waiting for it to stop, since it can share the player with this one.
+
+        :param player: Ai object to call choose_move on.
+        :param args: Arguments for choose_move.
+        """
+        self.cancel(None)
+        with self._lock:
+            self._search += 1
+            self._player = player
+            self._move = None
+            self._error = None
+        player.clear_stop()
+        self._thread = threading.Thread(target=self._run,
+                                        args=(player, self._search, args),
+                                        daemon=True)
+        self._thread.start()
+
+    def ponder(self, player, position):
+        """
+        Starts player pondering position while the opponent decides, unless
+        it is pondering it already. The pondering is cancelled by start, so
+        the search of the player's move can use what it found.
+
+        :param player: HardAi to call ponder on.
+        :param position: BoardState with the opponent to move.
+        """
+        if self._pondering == position:
+            return
+        self.cancel(None)
+        with self._lock:
+            self._search += 1
+            self._player = player
+            self._pondering = position
+        player.clear_stop()
+        self._thread = threading.Thread(target=player.ponder,
+                                        args=(position,), daemon=True)
+        self._thread.start()
+
+    def is_pondering(self):
+        """
+        :return: Boolean for if a player is pondering or has finished
+                 pondering and not been cancelled.
+        """
+        return self._pondering is not None
+
+    def _run(self, player, search, args):
+        """
+        Chooses the move in the background thread.
+        """
+        move = error = None
+        try:
+            move = player.choose_move(*args)
+        except SearchCancelled:
+            return
+        except Exception as exception:
+            error = exception
+        with self._lock:
+            if search == self._search:
+                self._move, self._error = move, error
+
+    def is_thinking(self):
+        """
+        :return: Boolean for if a move is being chosen or is chosen and not
+                 yet collected by poll.
+        """
+        return self._player is not None and self._pondering is None
+
+    def poll(self, timeout=0):
+        """
+        Checks if the move is ready without blocking for longer than timeout.
+        Errors raised by choose_move are raised here.
+
+        :param timeout: Seconds to wait for the move.
+        :return: Integer of the move once it is chosen, otherwise None.
+        """
+        if self._thread is None or self._pondering is not None:
+            return None
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return None
+        with self._lock:
+            move, error = self._move, self._error
+            self._thread = self._player = None
+            self._move = self._error = None
+        if error is not None:
+            raise error
+        return move
+
+    def cancel(self, timeout=1.0):
+        """
+        Stops the search running, if any, waiting up to timeout seconds for
+        it to finish. Its move is thrown away.
+
+        :param timeout: Seconds to wait for the search to stop, or None to
+                        wait until it has.
+        """
+        with self._lock:
+            player, thread = self._player, self._thread
+            self._search += 1
+            self._thread = self._player = self._pondering = None
+            self._move = self._error = None
+        if thread is not None:
+            player.request_stop()
+            thread.join(timeout)
@@ -0,0 +1,191 @@
+import numpy as np
+
+from Board import SOWING_CYCLES
+
+# the 13 flat indices each player sows into, indexed [turn - 1]
+CYCLES = np.array(SOWING_CYCLES, dtype=np.intp)
+# flat index of the first pit of each side, indexed [turn - 1]
+SIDE_START = np.array([0, 7], dtype=np.intp)
+PIT_OFFSETS = np.arange(6, dtype=np.intp)
+
+# winner values for games that have not ended and tied games
+NOT_ENDED = -1
+TIE = 0
+
+
+class BatchMancala:
+    """
+    Many Mancala games played at once with NumPy. The boards are an (N, 14)
+    integer array in the flat order of Board.flat(), with the player to move
+    and if each game has ended in arrays of length N. step plays one move in
+    every game that has not ended with the same rules as Rules.apply_move,
+    so random playouts can be run in bulk.
+    """
+
+    def __init__(self, count, seeds_per_pit=4, rng=None):
+        """
+        :param count: Number of games.
+        :param seeds_per_pit: Seeds in each pit at the start of a game.
+        :param rng: numpy.random.Generator for random moves, or None for a
+                    new unseeded one.
+        """
+        self.boards = np.zeros((count, 14), dtype=np.int16)
+        self.turns = np.ones(count, dtype=np.int8)
+        self.ended = np.zeros(count, dtype=bool)
+        self._seeds_per_pit = seeds_per_pit
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self.reset()
+
+    @classmethod
+    def from_states(cls, states, turns, rng=None):
+        """
+        Creates a batch from positions.
+
+        :param states: Sequence of BoardStates or sequences of 14 integers in
+                       flat order.
+        :param turns: Sequence of the player to move in each position.
+        :param rng: numpy.random.Generator for random moves, or None.
+        :return: BatchMancala of the positions, none of them ended.
+        """
+        batch = cls(len(states), rng=rng)
+        batch.boards[:] = [list(state) for state in states]
+        batch.turns[:] = turns
+        return batch
+
+    def __len__(self):
+        return len(self.boards)
+
+    def reset(self):
+        """
+        Sets every game back to the start with player 1 to move.
+        """
+        self.boards[:] = self._seeds_per_pit
+        self.boards[:, 6] = 0
+        self.boards[:, 13] = 0
+        self.turns[:] = 1
+        self.ended[:] = False
+
+    def valid_moves(self):
+        """
+        :return: (N, 6) boolean array of the pits 1-6 with seeds on the side
+                 of the player to move, all False in ended games.
+        """
+        columns = SIDE_START[self.turns - 1][:, None] + PIT_OFFSETS
+        pits = np.take_along_axis(self.boards, columns, axis=1)
+        return (pits > 0) & ~self.ended[:, None]
+
+    def random_moves(self):
+        """
+        Picks a random valid move in each game, like EasyAi.choose_move.
+
+        :return: (N,) integer array of pit numbers (1-6), 0 in ended games.
+        """
+        valid = self.valid_moves()
+        weights = self._rng.random(valid.shape) * valid
+        moves = weights.argmax(axis=1) + 1
+        moves[~valid.any(axis=1)] = 0
+        return moves
+
+    def step(self, pits):
+        """
+        Plays a move in every game that has not ended, the same as
+        Rules.apply_move: sows the seeds skipping the opponent's store, gives
+        another turn if the last seed is in the player's store, captures the
+        opposite pit if the last seed is in an empty pit on the player's
+        side, and ends the game when the player to move next has no seeds,
+        moving the seeds left to the store on their side. Games that have
+        ended and moves of 0 or empty pits are skipped.
+
+        :param pits: (N,) integer array of pit numbers (1-6) to play.
+        :return: Tuple of (N,) arrays of if each game played a move, got
+                 another turn, the seeds captured, and if the game ended.
+        """
+        count = len(self.boards)
+        pits = np.asarray(pits, dtype=np.intp)
+        played = np.zeros(count, dtype=bool)
+        extra = np.zeros(count, dtype=bool)
+        captured = np.zeros(count, dtype=np.int16)
+        ended = np.zeros(count, dtype=bool)
+
+        games = np.nonzero(~self.ended & (pits >= 1) & (pits <= 6))[0]
+        turns = self.turns[games].astype(np.intp)
+        own = SIDE_START[turns - 1]
+        start = own + pits[games] - 1
+        seeds = self.boards[games, start].astype(np.intp)
+        games, turns, own, start, seeds = (
+            values[seeds > 0] for values in (games, turns, own, start, seeds))
+        if not len(games):
+            return played, extra, captured, ended
+        boards = self.boards[games]
+        rows = np.arange(len(games))
+        store = own + 6
+        opponent = 7 - own
+
+        # pick up the seeds and sow them, each of the 13 slots in the cycle
+        # gets one seed for each full lap and one more if it is in the rest
+        boards[rows, start] = 0
+        first = start - own + 1
+        laps, remainder = np.divmod(seeds, 13)
+        distance = (np.arange(13) - first[:, None]) % 13
+        added = laps[:, None] + (distance < remainder[:, None])
+        cycles = CYCLES[turns - 1]
+        boards[rows[:, None], cycles] += added.astype(boards.dtype)
+        last = cycles[rows, (first + seeds - 1) % 13]
+
+        # special rules
+        extra_turn = last == store
+        on_own_side = (last >= own) & (last < store)
+        opposite = np.where(on_own_side, 12 - last, 0)
+        capture = (on_own_side & (boards[rows, last] == 1) &
+                   (boards[rows, opposite] > 0))
+        taken = np.where(capture, boards[rows, opposite], 0)
+        boards[rows, opposite] -= taken
+        boards[rows, last] -= capture
+        boards[rows, store] += taken + capture
+
+        # end of game, the remaining seeds go to the store on their side
+        own_pits = np.take_along_axis(boards, own[:, None] + PIT_OFFSETS, 1)
+        opponent_pits = np.take_along_axis(
+            boards, opponent[:, None] + PIT_OFFSETS, 1)
+        own_empty = ~own_pits.any(axis=1)
+        game_over = own_empty | (~extra_turn & ~opponent_pits.any(axis=1))
+        sweep = np.where(own_empty, opponent, own)[game_over]
+        over_rows = rows[game_over]
+        sweep_pits = sweep[:, None] + PIT_OFFSETS
+        boards[over_rows, sweep + 6] += boards[over_rows[:, None],
+                                               sweep_pits].sum(axis=1)
+        boards[over_rows[:, None], sweep_pits] = 0
+        extra_turn &= ~game_over
+
+        self.boards[games] = boards
+        self.turns[games] = np.where(extra_turn, turns, 3 - turns)
+        self.ended[games] = game_over
+        played[games] = True
+        extra[games] = extra_turn
+        captured[games] = taken
+        ended[games] = game_over
+        return played, extra, captured, ended
+
+    def play_random(self, max_moves=1000):
+        """
+        Plays random moves in every game until they have all ended.
+
+        :param max_moves: Most moves to play in any game.
+        :return: (N,) integer array from winners.
+        """
+        for _ in range(max_moves):
+            if self.ended.all():
+                break
+            self.step(self.random_moves())
+        return self.winners()
+
+    def winners(self):
+        """
+        :return: (N,) integer array of the winning player number (1 or 2),
+                 TIE for tied games, or NOT_ENDED for games not ended.
+        """
+        stores1 = self.boards[:, 6]
+        stores2 = self.boards[:, 13]
+        result = np.where(stores1 > stores2, 1,
+                          np.where(stores2 > stores1, 2, TIE))
+        return np.where(self.ended, result, NOT_ENDED)
@@ -1,3 +1,205 @@
+# lookup tables built at import time so moves do not recompute the path
+# around the board. Slots are flat indices in the order of Board.flat().
+
+# most seeds a sowing table entry is built for, all the seeds in a game
+MAX_TABLE_SEEDS = 48
+
+# the 13 flat indices each player sows into in order, starting at their
+# pit 1 and skipping the opponent's store
+SOWING_CYCLES = tuple(
+    tuple(range((turn - 1) * 7, (turn - 1) * 7 + 7)) +
+    tuple(range((2 - turn) * 7, (2 - turn) * 7 + 6))
+    for turn in (1, 2)
+)
+
+# flat index of the pit opposite each pit, None for the stores
+OPPOSITE_SLOT = tuple(None if index in (6, 13) else 12 - index
+                      for index in range(14))
+
+# (side, pit) opposite each side and pit number, indexed [side - 1][pit - 1]
+OPPOSITE_PIT = tuple(tuple((3 - side, 7 - pit) for pit in range(1, 8))
+                     for side in (1, 2))
+
+
+def _next_pit(turn, side, pit):
+    # player's store (pit 7) or opponents last pit (pit 6) changes sides
+    if (side == turn and pit == 7) or (side != turn and pit == 6):
+        return 3 - side, 1
+    return side, pit + 1
+
+
+# (side, pit) after each side and pit, indexed [turn - 1][side - 1][pit - 1]
+NEXT_PIT = tuple(
+    tuple(tuple(_next_pit(turn, side, pit) for pit in range(1, 8))
+          for side in (1, 2))
+    for turn in (1, 2)
+)
+
+
+def get_sowing(turn, start_pit, seeds):
+    """
+    Works out where seeds picked up from start_pit are sown, one in each slot
+    counterclockwise skipping the opponent's store, from the number of full
+    laps of the 13 reachable slots and the remainder.
+
+    :param turn: The current player number (1 or 2).
+    :param start_pit: The pit the seeds were picked up from (1-6).
+    :param seeds: The number of seeds to sow.
+    :return: Tuple of the flat index of the slot the last seed is sown in,
+             and a tuple of (index, amount) for each slot sown in order.
+    """
+    cycle = SOWING_CYCLES[turn - 1]
+    laps, remainder = divmod(seeds, 13)
+    added = tuple((cycle[(start_pit + i) % 13],
+                   laps + 1 if i < remainder else laps)
+                  for i in range(min(seeds, 13)))
+    return cycle[(start_pit + seeds - 1) % 13], added
+
+
+# get_sowing for every turn, start pit and seed count up to MAX_TABLE_SEEDS,
+# indexed [turn - 1][start_pit - 1][seeds]
+SOWING_TABLE = tuple(
+    tuple(tuple(get_sowing(turn, pit, seeds)
+                for seeds in range(MAX_TABLE_SEEDS + 1))
+          for pit in range(1, 7))
+    for turn in (1, 2)
+)
+
+
+class BoardState:
+    """
+    An immutable, hashable snapshot of a Mancala board. The 14 slots are
+    stored flat in a bytes object in the same order as Board.flat(): player
+    1's pits 1-6, player 1's store, player 2's pits 1-6, player 2's store.
+    Has the same read methods as Board so it can be used anywhere a board
+    object is only read, and can be used as a dictionary key.
+    """
+    __slots__ = ('_seeds',)
+
+    def __init__(self, seeds):
+        """
+        :param seeds: Iterable of the 14 seed counts in flat board order.
+        """
+        object.__setattr__(self, '_seeds', bytes(seeds))
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Creates a BoardState from a 2x7 list.
+
+        :param board: 2x7 list of integers.
+        :return: BoardState with the same seeds as board.
+        """
+        return cls(board[0] + board[1])
+
+    @staticmethod
+    def index(side, pit):
+        """
+        :param side: The side of the board (1 or 2).
+        :param pit: The pit number (1-7).
+        :return: Integer of the flat index of the side and pit.
+        """
+        return (side - 1) * 7 + pit - 1
+
+    def __setattr__(self, name, value):
+        raise AttributeError('BoardState is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('BoardState is immutable')
+
+    def __getitem__(self, index):
+        return self._seeds[index]
+
+    def __len__(self):
+        return 14
+
+    def __iter__(self):
+        return iter(self._seeds)
+
+    def __eq__(self, other):
+        if isinstance(other, BoardState):
+            return self._seeds == other._seeds
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._seeds)
+
+    def __repr__(self):
+        return f'BoardState({list(self._seeds)})'
+
+    def to_bytes(self):
+        """
+        :return: Bytes of the 14 seed counts in flat board order.
+        """
+        return self._seeds
+
+    def get_state(self):
+        """
+        :return: This BoardState, it is already immutable.
+        """
+        return self
+
+    def get_board(self):
+        """
+        :return: New 2x7 list of integers with the seeds in this state.
+        """
+        seeds = self._seeds
+        return [list(seeds[:7]), list(seeds[7:])]
+
+    def flat(self):
+        """
+        :return: List of the seeds in each pit and store.
+        """
+        return list(self._seeds)
+
+    def get_pits_with_seeds(self, side):
+        """
+        Returns a list of the pit numbers on side with values > 0
+
+        :param side: The side of the board (1 or 2).
+        """
+        start = (side - 1) * 7
+        seeds = self._seeds
+        return [i + 1 for i in range(6) if seeds[start + i]]
+
+    def get_seeds_in_pit(self, side, pit):
+        """
+        :param side: The side of the board (1 or 2).
+        :param pit: The pit number (1-7).
+        :return: Integer of the seeds in the side and pit.
+        """
+        return self._seeds[(side - 1) * 7 + pit - 1]
+
+    def get_seeds_in_store(self, player_num):
+        """
+        :param player_num: The player number (1 or 2).
+        :return: Integer of the number of seeds in the player's store.
+        """
+        return self._seeds[player_num * 7 - 1]
+
+    def get_players_pits(self, player_number):
+        """
+        :param player_number: The player number (1 or 2).
+        :return: List of the six pits on the players side of the board.
+        """
+        start = (player_number - 1) * 7
+        return list(self._seeds[start:start + 6])
+
+    def has_seeds_on_side(self, side):
+        """
+        :param side: The side of the board (1 or 2).
+        :return: Boolean for if there are any seeds in the pits on the side.
+        """
+        start = (side - 1) * 7
+        return any(self._seeds[start:start + 6])
+
+    def store_has_seeds_to_win(self):
+        """
+        :return: Boolean for if one of the stores has over 24 seeds.
+        """
+        return self._seeds[6] > 24 or self._seeds[13] > 24
+
+
 class Board:
     """
     A board for a Mancala game that has a board data member, a 2d list,
@@ -35,10 +237,19 @@ class Board:
         """
         Sets _board to a new list.
 
-        :param: board: 2x7 List of integers.
+        :param: board: 2x7 List of integers, or a BoardState which is copied
+                       into a new 2x7 list.
         """
+        if isinstance(board, BoardState):
+            board = board.get_board()
         self._board = board
 
+    def get_state(self):
+        """
+        :return: BoardState, an immutable and hashable copy of _board.
+        """
+        return BoardState(self._board[0] + self._board[1])
+
     def update_gui(self, side, pit, amount):
         """
         Adjusts side and pit in gui to have +/- amount seeds.
@@ -49,6 +260,35 @@ class Board:
         """
         self._gui.update_pit(side, pit, amount)
 
+    def apply_changes(self, changes):
+        """
+        Adds each amount in changes to its slot, updating the gui with each
+        change in order if showing changes.
+
+        :param changes: List of (index, amount) tuples, where index is the
+                        flat index of the slot (0-13), from Rules.apply_move.
+        """
+        board = self._board
+        if self._show_changes:
+            for index, amount in changes:
+                side, pit = divmod(index, 7)
+                board[side][pit] += amount
+                self.update_gui(side + 1, pit + 1, amount)
+        else:
+            for index, amount in changes:
+                board[index // 7][index % 7] += amount
+
+    def undo_changes(self, changes):
+        """
+        Reverses the changes made by apply_changes, without updating the gui.
+
+        :param changes: List of (index, amount) tuples, where index is the
+                        flat index of the slot (0-13).
+        """
+        board = self._board
+        for index, amount in changes:
+            board[index // 7][index % 7] -= amount
+
     def reset(self):
         self._board = [[4, 4, 4, 4, 4, 4, 0], [4, 4, 4, 4, 4, 4, 0]]
         if self._gui:
@@ -110,13 +350,7 @@ class Board:
         :param pit: The pit number (1-6).
         :return: Tuple of the opposite side number, and opposite pit number.
         """
-        # get opposite side
-        opposite_side = 1
-        if side == 1:
-            opposite_side = 2
-        # get opposite of pit number
-        opposite_pit = 7 - pit
-        return opposite_side, opposite_pit
+        return OPPOSITE_PIT[side - 1][pit - 1]
 
     def get_next_pit(self, turn, side, pit):
         """
@@ -128,18 +362,28 @@ class Board:
         :param pit: The pit number (1-7).
         :return: Tuple containing the side and pit of the next pit.
         """
-        # check if changing sides of board
-        # player's store (pit 7) or opponents last pit (pit 6)
-        if (side == turn and pit == 7) or (side != turn and pit == 6):
-            pit = 1
-            # toggles side
-            if side == 1:
-                side = 2
-            else:
-                side = 1
+        return NEXT_PIT[turn - 1][side - 1][pit - 1]
+
+    def sow_seeds(self, turn, start_pit, seeds):
+        """
+        Sows seeds one at a time counterclockwise from start_pit, skipping the
+        opponent's store. Looks up the slots in SOWING_TABLE so each of the 13
+        reachable pits and stores is added to only once.
+
+        :param turn: The current player number (1 or 2).
+        :param start_pit: The pit the seeds were picked up from (1-6).
+        :param seeds: The number of seeds to sow.
+        :return: Tuple containing the side and pit of the last seed sown.
+        """
+        if seeds <= 0:
+            return turn, start_pit
+        if seeds <= MAX_TABLE_SEEDS:
+            last, added = SOWING_TABLE[turn - 1][start_pit - 1][seeds]
         else:
-            pit += 1
-        return side, pit
+            last, added = get_sowing(turn, start_pit, seeds)
+        for index, amount in added:
+            self.add_seeds(index // 7 + 1, index % 7 + 1, amount)
+        return last // 7 + 1, last % 7 + 1
 
     def get_seeds_in_store(self, player_num):
         """
@@ -0,0 +1,240 @@
+import argparse
+import mmap
+import os
+from array import array
+
+from Board import BoardState
+from Rules import apply_move, get_valid_moves
+
+MAGIC = b'MANCALA-EGDB1'
+# magic bytes then one byte for the most seeds in pits the file covers
+HEADER_SIZE = len(MAGIC) + 1
+DEFAULT_PATH = 'endgame.db'
+DEFAULT_MAX_SEEDS = 12
+
+# binomial coefficients BINOMIAL[n][k] for ranking pit counts
+BINOMIAL = [[1]]
+for _n in range(1, 48 + 13):
+    _row = [1] * (_n + 1)
+    for _k in range(1, _n):
+        _row[_k] = BINOMIAL[_n - 1][_k - 1] + BINOMIAL[_n - 1][_k]
+    BINOMIAL.append(_row)
+
+
+def binomial(n, k):
+    """
+    :return: Integer of n choose k, 0 if k is out of range.
+    """
+    if k < 0 or k > n:
+        return 0
+    return BINOMIAL[n][k]
+
+
+def count_positions(max_seeds):
+    """
+    :param max_seeds: The most seeds left in the 12 pits.
+    :return: Integer of the number of ways to put up to max_seeds seeds in
+             12 pits, the number of values in a database for max_seeds.
+    """
+    return binomial(max_seeds + 12, 12)
+
+
+def rank_pits(pits):
+    """
+    Numbers each way of putting seeds in 12 pits, all positions with fewer
+    seeds first, then in lexicographic order of the pits.
+
+    :param pits: Sequence of 12 pit counts, the player to move's pits 1-6
+                 then the opponent's pits 1-6.
+    :return: Integer index of pits in the database.
+    """
+    remaining = sum(pits)
+    # positions with fewer seeds come first
+    rank = binomial(remaining + 11, 12)
+    for i in range(11):
+        seeds = pits[i]
+        if seeds:
+            after = 11 - i
+            # positions with fewer seeds in this pit and the same before it
+            rank += (binomial(remaining + after, after) -
+                     binomial(remaining - seeds + after, after))
+            remaining -= seeds
+    return rank
+
+
+def get_pits(position, turn):
+    """
+    :param position: BoardState or sequence of 14 integers in flat order.
+    :param turn: The player to move (1 or 2).
+    :return: Tuple of the 12 pit counts, turn's pits then the opponent's.
+    """
+    own = tuple(position[0:6])
+    opponent = tuple(position[7:13])
+    if turn == 1:
+        return own + opponent
+    return opponent + own
+
+
+def _compositions(total, parts):
+    """
+    Yields every tuple of parts non-negative integers adding up to total.
+    """
+    if parts == 1:
+        yield (total,)
+        return
+    for first in range(total, -1, -1):
+        for rest in _compositions(total - first, parts - 1):
+            yield (first,) + rest
+
+
+def _solve(pits, values):
+    """
+    Works out the best margin for the player to move from pits, using the
+    values already in the database for every position a move can reach.
+
+    :return: Integer of the most seeds the player to move can get into their
+             store from now on, minus what the opponent gets.
+    """
+    position = BoardState(pits[:6] + (0,) + pits[6:] + (0,))
+    moves = get_valid_moves(position, 1)
+    if not moves:
+        # the game is over, the opponent gets the seeds on their side
+        return -sum(pits[6:])
+    best = None
+    for move in moves:
+        res = apply_move(position, 1, move)
+        child = res.position
+        value = child[6] - child[13]
+        if not res.ended:
+            if res.turn == 1:
+                value += values[rank_pits(get_pits(child, 1))]
+            else:
+                value -= values[rank_pits(get_pits(child, 2))]
+        if best is None or value > best:
+            best = value
+    return best
+
+
+def build_database(path=DEFAULT_PATH, max_seeds=DEFAULT_MAX_SEEDS,
+                   progress=None):
+    """
+    Builds the database of exact values for every position with up to
+    max_seeds seeds left in the pits by retrograde analysis and writes it to
+    path. Seeds never leave the stores, so a position only leads to positions
+    with the same number or fewer seeds in the pits. Levels are solved from
+    0 seeds up, and positions with the same number of seeds are solved with
+    seeds furthest along their side first, since a move that keeps every
+    seed in the pits only moves seeds along the mover's side.
+
+    The value of each position is the margin of future seeds for the player
+    to move with both players playing their best. Store counts do not change
+    how the game is played, so positions are the 12 pits seen from the
+    player to move.
+
+    :param path: String of the file to write.
+    :param max_seeds: The most seeds left in the pits, up to 48.
+    :param progress: Function called with each number of seeds when its
+                     level is done, or None.
+    """
+    if not 0 <= max_seeds <= 48:
+        raise ValueError('max_seeds must be from 0 to 48')
+    values = array('b', bytes(count_positions(max_seeds)))
+
+    def potential(pits):
+        return sum(i * (pits[i] + pits[i + 6]) for i in range(6))
+
+    for total in range(1, max_seeds + 1):
+        level = sorted(_compositions(total, 12), key=potential, reverse=True)
+        for pits in level:
+            values[rank_pits(pits)] = _solve(pits, values)
+        if progress:
+            progress(total)
+
+    with open(path, 'wb') as file:
+        file.write(MAGIC + bytes([max_seeds]))
+        values.tofile(file)
+
+
+class EndgameDatabase:
+    """
+    Read access to an endgame database file built by build_database. The
+    file is not opened until the first probe, then is memory mapped so only
+    the pages that are looked up are read. If the file does not exist every
+    probe returns None.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        :param path: String of the database file.
+        """
+        self._path = path
+        self._loaded = False
+        self._map = None
+        self._max_seeds = -1
+
+    def _load(self):
+        """
+        Opens and memory maps the file, checking its header.
+        """
+        self._loaded = True
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:len(MAGIC)] != MAGIC:
+            data.close()
+            raise ValueError(f'{self._path} is not an endgame database')
+        self._max_seeds = data[len(MAGIC)]
+        self._map = data
+
+    def get_max_seeds(self):
+        """
+        :return: Integer of the most seeds in pits the database covers, or
+                 -1 if there is no database file.
+        """
+        if not self._loaded:
+            self._load()
+        return self._max_seeds
+
+    def probe(self, position, turn):
+        """
+        Looks up the exact value of a position.
+
+        :param position: BoardState or sequence of 14 integers in flat order.
+        :param turn: The player to move (1 or 2).
+        :return: Integer of the most seeds turn can still get into their
+                 store minus what the opponent gets, or None if the position
+                 has more seeds in pits than the database covers.
+        """
+        if not self._loaded:
+            self._load()
+        if sum(position) - position[6] - position[13] > self._max_seeds:
+            return None
+        value = self._map[HEADER_SIZE + rank_pits(get_pits(position, turn))]
+        return value - 256 if value > 127 else value
+
+    def close(self):
+        """
+        Closes the memory map, it is opened again by the next probe.
+        """
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self._loaded = False
+        self._max_seeds = -1
+
+
+def main():
+    """Builds an endgame database from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Build the Mancala endgame database.')
+    parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    parser.add_argument('--seeds', type=int, default=DEFAULT_MAX_SEEDS,
+                        help='most seeds left in the pits to solve')
+    args = parser.parse_args()
+    build_database(args.path, args.seeds,
+                   lambda total: print(f'solved positions with {total} seeds'))
+
+
+if __name__ == '__main__':
+    main()
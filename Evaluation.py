@@ -0,0 +1,175 @@
+from Board import MAX_TABLE_SEEDS, OPPOSITE_SLOT
+
+# flat indices of player 1's pits, each paired with the pit opposite it
+PAIRED_PITS = tuple(range(6))
+
+# the pair each slot is part of, by the index of player 1's pit in it, None
+# for the stores
+PAIR_OF_SLOT = tuple(None if opposite is None else min(index, opposite)
+                     for index, opposite in enumerate(OPPOSITE_SLOT))
+
+
+class Feature:
+    """
+    One part of an evaluation, a sum of terms each scoring the seeds in one
+    slot, or in one of player 1's pits and the pit opposite it. Terms score
+    from player 1's view, higher in favor of player 1.
+    """
+
+    def __init__(self, name, slot_term=None, pair_term=None):
+        """
+        :param name: String naming the feature.
+        :param slot_term: Function of a flat slot index and its seeds
+                          returning an integer, or None.
+        :param pair_term: Function of the seeds in one of player 1's pits
+                          and in the pit opposite it returning an integer,
+                          or None.
+        """
+        self.name = name
+        self.slot_term = slot_term
+        self.pair_term = pair_term
+
+    def __repr__(self):
+        return f'Feature({self.name!r})'
+
+
+def _store_difference(index, seeds):
+    if index == 6:
+        return seeds
+    if index == 13:
+        return -seeds
+    return 0
+
+
+def _seeds_on_side(index, seeds):
+    if index < 6:
+        return seeds
+    if 6 < index < 13:
+        return -seeds
+    return 0
+
+
+def _mobility(index, seeds):
+    if not seeds or index in (6, 13):
+        return 0
+    return 1 if index < 6 else -1
+
+
+def _capture_threats(seeds, opposite):
+    # an empty pit can capture the seeds opposite it if a seed lands in it
+    if not seeds and opposite:
+        return opposite
+    if seeds and not opposite:
+        return -seeds
+    return 0
+
+
+# seeds in player 1's store minus player 2's, the evaluation the game has
+# always used
+STORE_DIFFERENCE = Feature('store_difference', slot_term=_store_difference)
+# seeds in player 1's pits minus player 2's, seeds that end on a side go to
+# that side's store at the end of the game
+SEEDS_ON_SIDE = Feature('seeds_on_side', slot_term=_seeds_on_side)
+# pits player 1 can play minus pits player 2 can play
+MOBILITY = Feature('mobility', slot_term=_mobility)
+# seeds player 1 could capture into an empty pit minus seeds player 2 could
+CAPTURE_THREATS = Feature('capture_threats', pair_term=_capture_threats)
+
+# weighted features to evaluate with, by name
+FEATURE_SETS = {
+    'stores': ((STORE_DIFFERENCE, 1),),
+    'positional': ((STORE_DIFFERENCE, 4), (SEEDS_ON_SIDE, 1), (MOBILITY, 1),
+                   (CAPTURE_THREATS, 1)),
+}
+
+
+class Evaluator:
+    """
+    A weighted sum of features that is kept up to date as moves are played.
+    The terms of every feature are added into one lookup table for each slot
+    and one for each pair of opposite pits, so a score is updated for a move
+    by looking up only the slots the move changed, like a Zobrist key, and
+    scoring a position takes no work once it is reached.
+    """
+
+    def __init__(self, features):
+        """
+        :param features: Sequence of tuples of a Feature and its integer
+                         weight, or the name of one in FEATURE_SETS.
+        """
+        if isinstance(features, str):
+            features = FEATURE_SETS[features]
+        self._features = tuple((feature.name, weight)
+                               for feature, weight in features)
+        counts = range(MAX_TABLE_SEEDS + 1)
+        slot_terms = [(feature.slot_term, weight)
+                      for feature, weight in features if feature.slot_term]
+        pair_terms = [(feature.pair_term, weight)
+                      for feature, weight in features if feature.pair_term]
+        # indexed [slot][seeds]
+        self._slot_table = tuple(
+            tuple(sum(weight * term(index, seeds)
+                      for term, weight in slot_terms) for seeds in counts)
+            for index in range(14))
+        # slots with a term, the only ones a move changes the score through
+        self._slots = frozenset(index for index in range(14)
+                                if any(self._slot_table[index]))
+        # a move changes 2 slots at the least
+        self._few_slots = not pair_terms and len(self._slots) <= 2
+        # indexed [pit][seeds][seeds in the opposite pit], or None
+        self._pair_table = None
+        if pair_terms:
+            self._pair_table = tuple(
+                tuple(tuple(sum(weight * term(seeds, opposite)
+                                for term, weight in pair_terms)
+                            for opposite in counts) for seeds in counts)
+                for _ in PAIRED_PITS)
+
+    def __repr__(self):
+        return f'Evaluator({self._features!r})'
+
+    def score(self, position):
+        """
+        Scores position from scratch.
+
+        :param position: BoardState or sequence of 14 integers in flat order.
+        :return: Integer score, higher in favor of player 1.
+        """
+        slot_table = self._slot_table
+        score = sum(slot_table[index][position[index]]
+                    for index in self._slots)
+        if self._pair_table is not None:
+            for pit in PAIRED_PITS:
+                score += self._pair_table[pit][position[pit]][
+                    position[12 - pit]]
+        return score
+
+    def update(self, score, position, result):
+        """
+        Updates the score of position to the score after a move, only
+        looking at the slots the move changed.
+
+        :param score: Integer score of position.
+        :param position: BoardState the move was played on.
+        :param result: MoveResult from Rules.apply_move.
+        :return: Integer score of the result's position.
+        """
+        parent = position.to_bytes()
+        child = result.position.to_bytes()
+        slot_table = self._slot_table
+        if self._few_slots:
+            # quicker to look at every slot with a term than at the changes
+            for index in self._slots:
+                table = slot_table[index]
+                score += table[child[index]] - table[parent[index]]
+            return score
+        changed = {index for index, _ in result.changes}
+        for index in changed & self._slots:
+            table = slot_table[index]
+            score += table[child[index]] - table[parent[index]]
+        if self._pair_table is not None:
+            for pit in {PAIR_OF_SLOT[index] for index in changed} - {None}:
+                table = self._pair_table[pit]
+                score += (table[child[pit]][child[12 - pit]] -
+                          table[parent[pit]][parent[12 - pit]])
+        return score
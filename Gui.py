@@ -1,3 +1,6 @@
+from collections import deque
+from functools import lru_cache
+
 import pygame
 import pygame.freetype
 
@@ -18,7 +21,71 @@ STORE_HEIGHT = 310
 PLAYER2_PIT_TOP = GAP + BOARD_TOP
 PLAYER1_PIT_TOP = GAP + BOARD_TOP + STORE_HEIGHT - PIT_HEIGHT
 SEED_FONT_COLOR = (0, 0, 0)
-FONT = pygame.freetype.Font('Arial.ttf', 38)
+SEED_FONT_SIZE = 38
+# milliseconds the sowing animation waits after each seed
+SEED_DELAY = 600
+FONT_PATH = 'Arial.ttf'
+
+
+@lru_cache(maxsize=None)
+def get_font(size, freetype=True):
+    """
+    Get the shared font for a size, loading it the first time it is asked
+    for so the font file is not parsed again for every text drawn.
+
+    Args:
+        size (int): The font size.
+        freetype (bool, optional): True for a pygame.freetype.Font, False for
+            a pygame.font.Font. Defaults to True.
+
+    Returns:
+        pygame.freetype.Font or pygame.font.Font: The font.
+    """
+    if freetype:
+        return pygame.freetype.Font(FONT_PATH, size)
+    return pygame.font.Font(FONT_PATH, size)
+
+
+@lru_cache(maxsize=256)
+def render_text(text, size, color=SEED_FONT_COLOR, freetype=True):
+    """
+    Get a surface with text rendered on it, rendering each text, size and
+    color only once so drawing it again is a blit. The surface is shared and
+    must not be drawn on.
+
+    Args:
+        text (str): The text to render.
+        size (int): The font size.
+        color (tuple, optional): The text color. Defaults to black.
+        freetype (bool, optional): True to render with pygame.freetype like
+            render_to, False to render antialiased with pygame.font.
+            Defaults to True.
+
+    Returns:
+        pygame.Surface: The rendered text.
+    """
+    if freetype:
+        return get_font(size).render(text, color)[0]
+    return get_font(size, False).render(text, True, color)
+
+
+@lru_cache(maxsize=None)
+def render_hole(width, height):
+    """
+    Get a surface with an empty hole drawn on it, drawing each size only
+    once. The surface is shared and must not be drawn on.
+
+    Args:
+        width (int): The width of the hole.
+        height (int): The height of the hole.
+
+    Returns:
+        pygame.Surface: The empty hole.
+    """
+    image = pygame.Surface([width, height])
+    image.fill(BOARD_BG)
+    pygame.draw.rect(image, PIT_BG, image.get_rect(), 0, border_radius=40)
+    return image
 
 
 class Hole(pygame.sprite.Sprite):
@@ -37,10 +104,8 @@ class Hole(pygame.sprite.Sprite):
             seeds (int, optional): The initial number of seeds in the hole. Defaults to 0.
         """
         super().__init__()
-        self.image = pygame.Surface([width, height])
-        self.image.fill(BOARD_BG)
+        self.image = render_hole(width, height).copy()
         self.rect = self.image.get_rect()
-        pygame.draw.rect(self.image, PIT_BG, self.rect, 0, border_radius=40)
         self.text_rect = self.rect.copy()
         self.text_rect.x = self.text_rect.centerx - 12
         self.text_rect.y = self.text_rect.centery - 12
@@ -48,7 +113,8 @@ class Hole(pygame.sprite.Sprite):
         self.rect.x = left
         self.rect.y = top
         self.seeds = seeds
-        FONT.render_to(self.image, self.text_rect, str(self.seeds))
+        self.image.blit(render_text(str(self.seeds), SEED_FONT_SIZE),
+                        self.text_rect)
 
         self.change = None
         self.time_showing_changed = 0
@@ -58,10 +124,9 @@ class Hole(pygame.sprite.Sprite):
         """
          Update the display of the hole on the screen.
         """
-        self.image.fill(BOARD_BG)
-        rect = self.image.get_rect()
-        pygame.draw.rect(self.image, PIT_BG, rect, 0, border_radius=40)
-        FONT.render_to(self.image, self.text_rect, str(self.seeds))
+        self.image.blit(render_hole(*self.image.get_size()), (0, 0))
+        self.image.blit(render_text(str(self.seeds), SEED_FONT_SIZE),
+                        self.text_rect)
         if self.change:
             self.display_changed_seed_count(self.change)
         if self.can_select and self.seeds > 0:
@@ -85,9 +150,7 @@ class Hole(pygame.sprite.Sprite):
         sign = ""
         if amount > 0:
             sign = '+'
-        change_font = pygame.freetype.Font('Arial.ttf', 18)
-        change_font.render_to(self.image, self.image.get_rect(),
-                              sign + str(amount))
+        self.image.blit(render_text(sign + str(amount), 18), (0, 0))
 
     def change_seed_count(self, amount):
         """
@@ -163,8 +226,7 @@ class Display:
         """
         Display the title of the game on the screen.
         """
-        font = pygame.font.Font('Arial.ttf', 62)
-        text = font.render('Mancala', True, (255, 255, 255))
+        text = render_text('Mancala', 62, (255, 255, 255), False)
         self._screen.blit(text, ((W_WIDTH // 2) - text.get_size()[0] // 2,
                                  GAP))
 
@@ -174,15 +236,27 @@ class GameScreen(Display):
     Represents the game screen of the Mancala game.
     Inherits from the Display class.
     """
-    def __init__(self, screen):
+    def __init__(self, screen, seed_delay=SEED_DELAY):
         """
         Initialize a GameScreen object.
 
         Args:
             screen (pygame.Surface): The screen to display the game on.
+            seed_delay (int, optional): Milliseconds the sowing animation
+                waits after each seed. Defaults to SEED_DELAY.
         """
         super().__init__(screen)
         self._change_pits = []
+        # holes redrawn since the screen was last refreshed
+        self._dirty_holes = []
+        # animation steps not shown yet, tuples of the function to call, its
+        # arguments and the milliseconds to wait after it
+        self._animation = deque()
+        self._next_step_time = 0
+        self._seed_delay = seed_delay
+        self._fast_forward = False
+        # the AI thinking text on the screen, None if it isn't showing
+        self._thinking_text = None
         self.all_sprites = pygame.sprite.Group()
         self.stores = pygame.sprite.Group()
         self.pits = [pygame.sprite.Group(), pygame.sprite.Group()]
@@ -196,6 +270,9 @@ class GameScreen(Display):
         Reset the game screen by emptying the stores and pits.
         """
         self._change_pits = []
+        self._dirty_holes = []
+        self._animation.clear()
+        self._thinking_text = None
         self.stores.empty()
         self.pits[0].empty()
         self.pits[1].empty()
@@ -208,39 +285,79 @@ class GameScreen(Display):
         Set the game mode.
 
         Args:
-            mode (str): The game mode to set. (TWO, EASY, or HARD)
+            mode (str): The game mode to set. (TWO, EASY, HARD, or MCTS)
         """
         self._mode = mode
 
     def display_turn(self, name, turn):
         """
-        Display the current turn on the screen.
+        Display the current turn on the screen, once the animation of the
+        moves before it has finished.
 
         Args:
             name (str): The name of the player whose turn it is.
             turn (int): The current turn number.
         """
-        turn_font = pygame.freetype.Font('Arial.ttf', 28)
+        self.after_animation(self._show_turn, name, turn)
 
+    def _show_turn(self, name, turn):
+        """
+        Draw the current turn and highlight the pits that can be selected.
+
+        Args:
+            name (str): The name of the player whose turn it is.
+            turn (int): The current turn number.
+        """
         turn_rect = pygame.Rect(10, 100,
                                 W_WIDTH // 3, 40)
         pygame.draw.rect(self._screen, (0, 0, 0),
                          turn_rect, 0, 0)
 
-        turn_font.render_to(self._screen, turn_rect, 'Turn: ' + name,
-                            (255, 255, 255))
+        self._screen.blit(render_text('Turn: ' + name, 28, (255, 255, 255)),
+                          turn_rect)
 
         if (self._mode == 'TWO') or (self._mode != 'TWO' and turn == 1):
-            # add border to pits on players side
+            # add border to pits on players side, only redrawing the pits
+            # whose border changes
             for i in range(len(self.pits)):
                 for pit in self.pits[i].sprites():
                     if i + 1 == turn:
-                        if pit.seeds > 0:
+                        if pit.seeds > 0 and not pit.can_select:
                             pit.can_select = True
                             self.update(pit)
-                    else:
+                    elif pit.can_select:
                         pit.can_select = False
                         self.update(pit)
+        self.refresh(turn_rect)
+
+    def display_thinking(self, name):
+        """
+        Display that an AI is choosing its move, with dots that count up over
+        time, updating only that part of the screen and only when the dots
+        change.
+
+        Args:
+            name (str): The name of the AI that is thinking.
+        """
+        dots = '.' * (pygame.time.get_ticks() // 400 % 4)
+        text = name + ' is thinking' + dots
+        if text == self._thinking_text:
+            return
+        self._thinking_text = text
+        thinking_rect = pygame.Rect(10, 145, W_WIDTH // 3, 35)
+        pygame.draw.rect(self._screen, (0, 0, 0), thinking_rect, 0, 0)
+        self._screen.blit(render_text(text, 24, (180, 190, 170)),
+                          thinking_rect)
+        pygame.display.update(thinking_rect)
+
+    def clear_thinking(self):
+        """
+        Remove the AI thinking text from the screen.
+        """
+        self._thinking_text = None
+        thinking_rect = pygame.Rect(10, 145, W_WIDTH // 3, 35)
+        pygame.draw.rect(self._screen, (0, 0, 0), thinking_rect, 0, 0)
+        pygame.display.update(thinking_rect)
 
     def display_board(self):
         """
@@ -258,8 +375,6 @@ class GameScreen(Display):
             player1 (str): Name of player 1.
             player2 (str): Name of player 2.
         """
-        player_font = pygame.freetype.Font('Arial.ttf', 28)
-
         player1_rect = pygame.Rect(10, 20,
                                    W_WIDTH // 3, 40)
         player2_rect = pygame.Rect(10, 60,
@@ -271,10 +386,10 @@ class GameScreen(Display):
         player1_text = 'Player 1: ' + player1
         player2_text = 'Player 2: ' + player2
 
-        player_font.render_to(self._screen, player1_rect, player1_text,
-                              (255, 255, 255))
-        player_font.render_to(self._screen, player2_rect, player2_text,
-                              (255, 255, 255))
+        self._screen.blit(render_text(player1_text, 28, (255, 255, 255)),
+                          player1_rect)
+        self._screen.blit(render_text(player2_text, 28, (255, 255, 255)),
+                          player2_rect)
 
     def initialize_stores(self):
         """
@@ -332,19 +447,38 @@ class GameScreen(Display):
             player2_name = 'EASY AI'
         if player2_name == -2:
             player2_name = 'HARD AI'
+        if player2_name == -3:
+            player2_name = 'MCTS AI'
 
         self.display_players(player1_name, player2_name)
         self.display_turn(player1_name, 1)
 
     def update(self, hole):
         """
-        Update the display after a move is made.
+        Redraw a hole after it changed. It is shown on the screen by the next
+        refresh.
 
         Args:
             hole (Hole): The hole that was updated.
         """
         hole.update_display()
-        self.all_sprites.draw(self._screen)
+        if hole not in self._dirty_holes:
+            self._dirty_holes.append(hole)
+
+    def refresh(self, *rects):
+        """
+        Draw the holes changed since the last refresh onto the screen and
+        update only their part of the display, so the work depends on the
+        holes changed and not on the size of the window.
+
+        Args:
+            *rects (pygame.Rect): Other parts of the screen that were drawn
+                on and need updating.
+        """
+        changed = [self._screen.blit(hole.image, hole.rect)
+                   for hole in self._dirty_holes]
+        self._dirty_holes = []
+        pygame.display.update(changed + list(rects))
 
     def update_pit(self, side, hole_num, amount):
         """
@@ -355,16 +489,135 @@ class GameScreen(Display):
             hole_num (int): The number of the hole.
             amount (int): The new seed count for the hole.
         """
+        self._queue_step(self._show_pit_change, (side, hole_num, amount),
+                         self._seed_delay)
+
+    def _show_pit_change(self, side, hole_num, amount):
+        """
+        Change the seed count of a pit as an animation step.
+
+        Args:
+            side (int): The side of the pit (1 for player 1, 2 for player 2).
+            hole_num (int): The number of the hole.
+            amount (int): The change in seed count for the hole.
+        """
         hole = self.get_pit(side, hole_num)
         hole.change_seed_count(amount)
         self._change_pits.append(hole)
         self.update(hole)
-        pygame.display.flip()
-        pygame.time.delay(600)
+
+    def _queue_step(self, function, args, delay):
+        """
+        Add a step to the end of the animation.
+
+        Args:
+            function (callable): Function that draws the step.
+            args (tuple): Arguments for function.
+            delay (int): Milliseconds to wait after the step.
+        """
+        if not self._animation:
+            # starts now, or once the wait after the last step is over
+            self._next_step_time = max(self._next_step_time,
+                                       pygame.time.get_ticks())
+        self._animation.append((function, args, delay))
+
+    def after_animation(self, function, *args):
+        """
+        Call function once the animation queued so far has been shown, or
+        now if there is none.
+
+        Args:
+            function (callable): The function to call.
+            *args: Arguments for function.
+        """
+        if self._animation:
+            self._queue_step(function, args, 0)
+        else:
+            function(*args)
+
+    def animate(self, now=None):
+        """
+        Show the animation steps that are due, and refresh the holes they
+        changed. Called by the main loop every frame so the game keeps
+        handling events while seeds are sown.
+
+        Args:
+            now (int, optional): Time in milliseconds, like
+                pygame.time.get_ticks(). Defaults to the current time.
+
+        Returns:
+            bool: True if any step was shown.
+        """
+        if now is None:
+            now = pygame.time.get_ticks()
+        shown = False
+        while self._animation and (self._fast_forward or
+                                   now >= self._next_step_time):
+            function, args, delay = self._animation.popleft()
+            function(*args)
+            if not self._fast_forward:
+                self._next_step_time += delay
+            shown = True
+        if shown:
+            self.refresh()
+        return shown
+
+    def skip_animation(self):
+        """
+        Show every animation step queued straight away, like when the player
+        clicks during the animation.
+        """
+        self._next_step_time = 0
+        while self._animation:
+            function, args, _ = self._animation.popleft()
+            function(*args)
+        self.refresh()
+
+    def step_animation(self):
+        """
+        Show the next animation step straight away without waiting for it,
+        for drawing every step of a move as fast as possible.
+
+        Returns:
+            bool: True if a step was shown, False if there were none left.
+        """
+        if not self._animation:
+            return False
+        function, args, _ = self._animation.popleft()
+        function(*args)
+        self.refresh()
+        return True
+
+    def is_animating(self):
+        """
+        Returns:
+            bool: True if there are animation steps not shown yet.
+        """
+        return bool(self._animation)
+
+    def set_seed_delay(self, seed_delay):
+        """
+        Set the speed of the sowing animation.
+
+        Args:
+            seed_delay (int): Milliseconds to wait after each seed.
+        """
+        self._seed_delay = seed_delay
+
+    def set_fast_forward(self, fast_forward):
+        """
+        Set if animation steps are shown as soon as animate is called without
+        waiting, like when the AI plays itself.
+
+        Args:
+            fast_forward (bool): True to stop waiting between steps.
+        """
+        self._fast_forward = fast_forward
 
     def remove_change_display(self, hole):
         """
-        Remove the display of seed count change for a hole.
+        Remove the display of seed count change for a hole. It is shown on
+        the screen by the next refresh.
 
         Args:
             hole (Hole): The hole to remove the change display from.
@@ -431,6 +684,8 @@ class SelectScreen(Display):
     def __init__(self, screen):
         super().__init__(screen)
         self._buttons = []
+        # the button drawn as hovered over, or None
+        self._hovered = None
 
     def display_button(self, rect, text, offset_x, offset_y, hover=False,
                        add=True):
@@ -452,7 +707,11 @@ class SelectScreen(Display):
                          border_radius=10)
         self.display_button_text(rect, text, offset_x, offset_y)
         if add:
-            self._buttons.append((rect, text, (offset_x, offset_y)))
+            button = (rect, text, (offset_x, offset_y))
+            self._buttons.append(button)
+            # drawn again by start, without the hover color
+            if button == self._hovered:
+                self._hovered = None
 
     def display_button_text(self, rect, text, offset_x, offset_y):
         """
@@ -465,14 +724,15 @@ class SelectScreen(Display):
             offset_y (int): The y-axis offset for the text.
         """
 
-        font = pygame.font.Font('Arial.ttf', 26)
-        text = font.render(text, True, (0, 0, 0))
+        text = render_text(text, 26, (0, 0, 0), False)
         self._screen.blit(text, (rect[0] + offset_x,
                                  rect[1] + offset_y))
 
     def check_hover(self, mouse_pos):
         """
-        Checks if the mouse is hovering over any button.
+        Checks if the mouse is hovering over any button, and redraws only
+        the buttons that started or stopped being hovered over, updating only
+        their part of the display.
 
         Args:
             mouse_pos (tuple): The current position of the mouse.
@@ -480,14 +740,22 @@ class SelectScreen(Display):
         Returns:
             None
         """
+        hovered = None
         for button in self._buttons:
-            rect, text, (offset_x, offset_y) = button
-            hover = False
-            converted = pygame.Rect(rect)
-            if converted.collidepoint(mouse_pos):
-                hover = True
-            self.display_button(rect, text, offset_x, offset_y, hover, False)
-            pygame.display.flip()
+            if pygame.Rect(button[0]).collidepoint(mouse_pos):
+                hovered = button
+                break
+        if hovered == self._hovered:
+            return
+        changed = []
+        for button, hover in ((self._hovered, False), (hovered, True)):
+            if button is not None:
+                rect, text, (offset_x, offset_y) = button
+                self.display_button(rect, text, offset_x, offset_y, hover,
+                                    False)
+                changed.append(pygame.Rect(rect))
+        self._hovered = hovered
+        pygame.display.update(changed)
 
 
 class GameModeScreen(SelectScreen):
@@ -503,6 +771,8 @@ class GameModeScreen(SelectScreen):
                    400, BUTTON_WIDTH, BUTTON_HEIGHT)
     HARD_BUTTON = (W_WIDTH // 2 - BUTTON_WIDTH // 2,
                    500, BUTTON_WIDTH, BUTTON_HEIGHT)
+    MCTS_BUTTON = (W_WIDTH // 2 - BUTTON_WIDTH // 2,
+                   600, BUTTON_WIDTH, BUTTON_HEIGHT)
     INSTRUCTION_BUTTON = (W_WIDTH // 2 - BUTTON_WIDTH // 2,
                           140, BUTTON_WIDTH, BUTTON_HEIGHT)
 
@@ -530,8 +800,8 @@ class GameModeScreen(SelectScreen):
             None
         """
         self.display_button(self.INSTRUCTION_BUTTON, 'How To Play', 20, 14)
-        font = pygame.font.Font('Arial.ttf', 34)
-        text = font.render('Please Select a Game Mode', True, (180, 190, 170))
+        text = render_text('Please Select a Game Mode', 34, (180, 190, 170),
+                           False)
         self._screen.blit(text, (W_WIDTH // 2 - text.get_width() // 2, 230))
 
     def display_player_options(self):
@@ -544,6 +814,7 @@ class GameModeScreen(SelectScreen):
         self.display_button(self.TWO_PLAYER_BUTTON, '2 PLAYERS', 22, 14)
         self.display_button(self.EASY_BUTTON, 'VS EASY AI', 21, 14)
         self.display_button(self.HARD_BUTTON, 'VS HARD AI', 19, 14)
+        self.display_button(self.MCTS_BUTTON, 'VS MCTS AI', 18, 14)
 
     def check_click(self, mouse_pos):
         """
@@ -559,6 +830,8 @@ class GameModeScreen(SelectScreen):
             return 'EASY'
         if pygame.Rect(self.HARD_BUTTON).collidepoint(mouse_pos):
             return 'HARD'
+        if pygame.Rect(self.MCTS_BUTTON).collidepoint(mouse_pos):
+            return 'MCTS'
         if pygame.Rect(self.TWO_PLAYER_BUTTON).collidepoint(mouse_pos):
             return 'TWO'
         if pygame.Rect(self.INSTRUCTION_BUTTON).collidepoint(mouse_pos):
@@ -629,7 +902,7 @@ class PlayerNameScreen(SelectScreen):
         self._active = None
         self._player_one_text = ''
         self._player_two_text = ''
-        self._game_mode = None  # 'TWO' or 'EASY' or 'HARD'
+        self._game_mode = None  # 'TWO' or 'EASY' or 'HARD' or 'MCTS'
 
     def start(self, game_mode):
         """
@@ -693,8 +966,9 @@ class PlayerNameScreen(SelectScreen):
             bg = (200, 200, 200)
         pygame.draw.rect(self._screen, bg,
                          input_one_rect, border_radius=10)
-        font = pygame.font.Font('Arial.ttf', 30)
-        text_surface = font.render(self._player_one_text, True, (0, 0, 0))
+        # typed text changes with every key, so only the font is shared
+        text_surface = get_font(30, False).render(self._player_one_text, True,
+                                                  (0, 0, 0))
         # set width so text cannot go outside input_one_rect
         input_one_rect.w = max(100, text_surface.get_width() + 10)
         self._screen.blit(text_surface,
@@ -710,8 +984,9 @@ class PlayerNameScreen(SelectScreen):
             bg = (200, 200, 200)
         pygame.draw.rect(self._screen, bg,
                          input_two_rect, border_radius=10)
-        font = pygame.font.Font('Arial.ttf', 30)
-        text_surface = font.render(self._player_two_text, True, (0, 0, 0))
+        # typed text changes with every key, so only the font is shared
+        text_surface = get_font(30, False).render(self._player_two_text, True,
+                                                  (0, 0, 0))
         # set width so text cannot go outside input_one_rect
         input_two_rect.w = max(100, text_surface.get_width() + 10)
         self._screen.blit(text_surface,
@@ -721,18 +996,16 @@ class PlayerNameScreen(SelectScreen):
         """
         Displays the prompt for entering player one's name.
         """
-        font = pygame.font.Font('Arial.ttf', 34)
-        text = font.render('Please Enter Player One\'s Name',
-                           True, (180, 190, 170))
+        text = render_text('Please Enter Player One\'s Name', 34,
+                           (180, 190, 170), False)
         self._screen.blit(text, (W_WIDTH // 2 - text.get_width() // 2, 200))
 
     def display_player_two_prompt(self):
         """
         Displays the prompt for entering player two's name.
         """
-        font = pygame.font.Font('Arial.ttf', 34)
-        text = font.render('Please Enter Player Two\'s Name',
-                           True, (180, 190, 170))
+        text = render_text('Please Enter Player Two\'s Name', 34,
+                           (180, 190, 170), False)
         self._screen.blit(text, (W_WIDTH // 2 - text.get_width() // 2, 360))
 
     def check_click(self, mouse_pos):
@@ -752,6 +1025,8 @@ class PlayerNameScreen(SelectScreen):
                 self._player_two_text = -1
             if self._game_mode == 'HARD':
                 self._player_two_text = -2
+            if self._game_mode == 'MCTS':
+                self._player_two_text = -3
 
             # handle empty input
             if not self._player_one_text:
@@ -832,8 +1107,7 @@ class EndScreen(SelectScreen):
         Returns:
             None
         """
-        font = pygame.font.Font('Arial.ttf', 34)
-        text = font.render(winner_str, True, (180, 190, 170))
+        text = render_text(winner_str, 34, (180, 190, 170), False)
         self._screen.blit(text, (self.BOX[0] + 45, self.BOX[1] + offset_y))
 
     def display_box(self):
@@ -867,11 +1141,16 @@ class GraphicInterface:
     """
     Class representing the graphic interface for the Mancala game.
     """
-    def __init__(self):
+    def __init__(self, seed_delay=SEED_DELAY):
+        """
+        Args:
+            seed_delay (int, optional): Milliseconds the sowing animation
+                waits after each seed. Defaults to SEED_DELAY.
+        """
         self._screen = pygame.display.set_mode((W_WIDTH, W_HEIGHT))
         self._select_mode_screen = GameModeScreen(self._screen)
         self._player_screen = PlayerNameScreen(self._screen)
-        self._game_screen = GameScreen(self._screen)
+        self._game_screen = GameScreen(self._screen, seed_delay)
         self._end_screen = EndScreen(self._screen)
         self._instructions = InstructionsScreen(self._screen)
         self._screens = [self._select_mode_screen, self._player_screen,
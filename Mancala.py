@@ -1,7 +1,8 @@
-from copy import deepcopy
-
 from Board import Board
-from Player import Player, EasyAi, HardAi
+from EndgameDatabase import DEFAULT_PATH as ENDGAME_DB_PATH
+from OpeningBook import DEFAULT_PATH as OPENING_BOOK_PATH
+from Player import Player, EasyAi, HardAi, MctsAi
+from Rules import apply_move
 
 
 class Mancala:
@@ -62,10 +63,10 @@ class Mancala:
         Returns a tuple representing the state of game, containing all the
         values necessary to return Game to the current state.
 
-        :return: Tuple containing turn (1 or 2), board (2x7 list of integers),
+        :return: Tuple containing turn (1 or 2), board (BoardState),
         ended Boolean, winner string or None, special1 Boolean.
         """
-        return (self._turn, deepcopy(self._board.get_board()), self._ended,
+        return (self._turn, self._board.get_state(), self._ended,
                 self._winner, self.special1)
 
     def restore_state(self, saved_state):
@@ -73,29 +74,45 @@ class Mancala:
         Sets data members to values passed in saved_state
 
         :param saved_state: Tuple containing turn (1 or 2),
-        board (2x7 list of integers), ended Boolean, winner string or None,
-        special1 Boolean.
+        board (BoardState or 2x7 list of integers), ended Boolean, winner
+        string or None, special1 Boolean.
         """
         (self._turn, board, self._ended,
          self._winner, self.special1) = saved_state
         self._board.set_board(board)
 
-    def create_player(self, name):
+    def create_player(self, name, **options):
         """
         Creates a new player object and stores it in _players data member.
         Only creates a player if there are less than 2.
 
         :param name: String of the players name or integer for Ai difficulty
-                     -1 is easy, -2 is hard.
+                     -1 is easy, -2 is hard, -3 is MCTS.
+        :param options: Keyword arguments for the Ai's constructor, replacing
+                        the settings used in the game (like max_depth and
+                        time_limit for the hard Ai). Only the hard and MCTS
+                        Ais take any.
 
         :return: Player object that was created.
         """
+        if options and name not in (-2, -3):
+            raise ValueError(f'player {name!r} takes no options, got '
+                             f'{", ".join(options)}')
         if len(self._players) < 2:
             player_num = len(self._players) + 1
             if name == -1:
                 player = EasyAi(self._board, player_num)
             elif name == -2:
-                player = HardAi(self._board, player_num)
+                settings = {'time_limit': HardAi.GAME_TIME_LIMIT,
+                            'max_depth': None,
+                            'endgame_path': ENDGAME_DB_PATH,
+                            'book_path': OPENING_BOOK_PATH}
+                settings.update(options)
+                player = HardAi(self._board, player_num, **settings)
+            elif name == -3:
+                settings = {'time_limit': MctsAi.GAME_TIME_LIMIT}
+                settings.update(options)
+                player = MctsAi(self._board, player_num, **settings)
             else:
                 player = Player(name, player_num)
             self._players.append(player)
@@ -112,8 +129,8 @@ class Mancala:
     def play_game(self, player, pit):
         """
         Plays an entire turn, first validates the input and state of the game,
-        and makes the move in the pit by calling make_move. Then checks if the
-        game is over, updating board, _ended, and _winner, and finally
+        and makes the move in the pit by calling make_move, which also checks
+        if the game is over, updating board, _ended, and _winner. Finally
         returns a list of the updated board.
 
         :param player: The player number (1 or 2).
@@ -139,40 +156,53 @@ class Mancala:
             # only makes the move if there are seeds in the pit
             if self._board.get_seeds_in_pit(self._turn, pit):
                 self.make_move(pit)
-                if self.is_end():
-                    self.end_game()
-                else:
-                    if not self.special1:
-                        self.toggle_turn()
-                    else:
-                        self.special1 = False
             return self._board.flat()
 
     def make_move(self, pit):
         """
-        The current player picks up the seeds in the pit, then calls
-        drop_seeds_in_pits to drop the seeds in each pit and checks for special
-        rules after dropping the last seed.
+        Plays the current player's move in the pit with Rules.apply_move, then
+        applies the changes to the board (showing them in the gui if there is
+        one), ends the game if it is over, and sets the next turn. Does not
+        validate the move, the pit must have seeds.
 
         :param pit: The pit number (1-6).
+        :return: Tuple undo token containing turn, special1, ended and winner
+                 from before the move and a list of only the pits changed,
+                 to pass to unmake_move.
+        """
+        token = (self._turn, self.special1, self._ended, self._winner)
+        result = apply_move(self._board.get_state(), self._turn, pit)
+        self._board.apply_changes(result.changes)
+        self._turn = result.turn
+        self.special1 = False
+        if result.ended:
+            self._ended = True
+            self._winner = self.get_winner()
+        return token + (result.changes,)
+
+    def unmake_move(self, undo_token):
+        """
+        Returns the game to the state before the make_move call that
+        returned undo_token. Moves must be unmade in the reverse order they
+        were made. The gui is not updated.
+
+        :param undo_token: Tuple returned by make_move.
         """
-        self.get_player_obj().pickup_seeds(
-            self._board.clear_pit(self._turn, pit))
-        self.drop_seeds_in_pits(pit)
+        (self._turn, self.special1, self._ended,
+         self._winner, changes) = undo_token
+        self._board.undo_changes(changes)
 
     def drop_seeds_in_pits(self, start_pit):
         """
-        Drops a seed that the current player is holding in the next pit on the
-        board until the player runs out of seeds. Then calls check_special.
+        Drops all the seeds the current player is holding, one in each pit
+        after start_pit, by sowing them on the board in a single pass. Then
+        calls check_special with the pit of the last seed.
 
         :param start_pit: The starting pit number (1-6)
         """
         player = self.get_player_obj()
-        side, pit = self._turn, start_pit
-        while player.number_of_seeds_in_hand() > 0:
-            side, pit = self._board.get_next_pit(self._turn, side, pit)
-            player.drop_seeds(1)
-            self._board.add_seeds(side, pit, 1)
+        side, pit = self._board.sow_seeds(self._turn, start_pit,
+                                          player.drop_all_seeds())
         self.check_special(side, pit)
 
     def is_end(self):
@@ -0,0 +1,129 @@
+import argparse
+import os
+import struct
+
+from Board import Board
+from Rules import apply_move, get_valid_moves
+from TranspositionTable import zobrist_key
+
+MAGIC = b'MANCALA-BOOK1'
+# each entry is the Zobrist key of the position and player to move, and a
+# bit for each pit (bit 0 for pit 1) that is one of the best moves
+ENTRY = struct.Struct('<QB')
+DEFAULT_PATH = 'opening.book'
+DEFAULT_PLIES = 4
+DEFAULT_DEPTH = 12
+
+
+def build_book(path=DEFAULT_PATH, plies=DEFAULT_PLIES, depth=DEFAULT_DEPTH,
+               progress=None):
+    """
+    Searches every position in the first plies moves of a game (each move
+    counts, including extra turns) to depth and writes the best moves for
+    the player to move to a book file. Positions with one move are left out.
+
+    :param path: String of the file to write.
+    :param plies: Integer of how many moves into the game to cover.
+    :param depth: Integer depth to search each position to.
+    :param progress: Function called with the ply and the number of
+                     positions at it when the ply is done, or None.
+    """
+    # imported here since the Hard Ai imports this module to read books
+    from Player import HardAi
+
+    searchers = {turn: HardAi(None, turn, max_depth=depth)
+                 for turn in (1, 2)}
+    entries = {}
+    positions = {(Board().get_state(), 1)}
+    for ply in range(plies):
+        next_positions = set()
+        for position, turn in positions:
+            moves = get_valid_moves(position, turn)
+            if len(moves) > 1:
+                ai = searchers[turn]
+                ai.new_search()
+                ratings = ai.rate_moves(position, moves, depth)
+                best = max(ratings)
+                mask = 0
+                for move, rating in zip(moves, ratings):
+                    if rating == best:
+                        mask |= 1 << (move - 1)
+                entries[zobrist_key(position, turn)] = mask
+            for move in moves:
+                res = apply_move(position, turn, move)
+                if not res.ended:
+                    next_positions.add((res.position, res.turn))
+        if progress:
+            progress(ply, len(positions))
+        positions = next_positions
+
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        for key in sorted(entries):
+            file.write(ENTRY.pack(key, entries[key]))
+
+
+class OpeningBook:
+    """
+    Read access to a book file built by build_book. The file is not read
+    until the first lookup. If the file does not exist every lookup returns
+    None.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        :param path: String of the book file.
+        """
+        self._path = path
+        self._entries = None
+
+    def _load(self):
+        """
+        Reads every entry of the file into a dictionary.
+        """
+        self._entries = {}
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, 'rb') as file:
+            data = file.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{self._path} is not an opening book')
+        for key, mask in ENTRY.iter_unpack(data[len(MAGIC):]):
+            self._entries[key] = mask
+
+    def __len__(self):
+        if self._entries is None:
+            self._load()
+        return len(self._entries)
+
+    def lookup(self, position, turn):
+        """
+        :param position: BoardState or sequence of 14 integers in flat order.
+        :param turn: The player to move (1 or 2).
+        :return: List of the best pit numbers for turn, or None if position
+                 is not in the book.
+        """
+        if self._entries is None:
+            self._load()
+        mask = self._entries.get(zobrist_key(position, turn))
+        if mask is None:
+            return None
+        return [pit for pit in range(1, 7) if mask & (1 << (pit - 1))]
+
+
+def main():
+    """Builds an opening book from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Build the Mancala opening book.')
+    parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    parser.add_argument('--plies', type=int, default=DEFAULT_PLIES,
+                        help='moves into the game to cover')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH,
+                        help='depth to search each position to')
+    args = parser.parse_args()
+    build_book(args.path, args.plies, args.depth,
+               lambda ply, count: print(f'ply {ply}: {count} positions'))
+
+
+if __name__ == '__main__':
+    main()
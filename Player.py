@@ -1,6 +1,30 @@
 import math
+import multiprocessing
 import random
-from copy import deepcopy
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, wait
+
+from Board import (BoardState, MAX_TABLE_SEEDS, OPPOSITE_SLOT, SOWING_TABLE,
+                   get_sowing)
+from EndgameDatabase import EndgameDatabase
+from Evaluation import Evaluator
+from OpeningBook import OpeningBook
+from Rules import apply_move, get_valid_moves
+from SearchStats import SearchStats
+from TranspositionTable import (EXACT, LOWER, UPPER, TranspositionTable,
+                                update_key, zobrist_key)
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time limit runs out.
+    """
+
+
+class SearchCancelled(Exception):
+    """
+    Raised out of choose_move when request_stop was called during the search.
+    """
 
 
 class Player:
@@ -64,6 +88,21 @@ class Ai(Player):
     def __init__(self, board_obj, player_num, name='AI'):
         super().__init__(name, player_num)
         self._board_obj = board_obj
+        self._stop_requested = False
+
+    def request_stop(self):
+        """
+        Asks a choose_move running in another thread to stop soon by raising
+        SearchCancelled. An Ai whose choose_move takes more than a moment has
+        to check _stop_requested while it searches, AiWorker waits for it.
+        """
+        self._stop_requested = True
+
+    def clear_stop(self):
+        """
+        Lets choose_move run again after request_stop.
+        """
+        self._stop_requested = False
 
     def get_valid_moves(self, side=None, board=None):
         """
@@ -82,47 +121,219 @@ class Ai(Player):
 
 class HardAi(Ai):
     """
-    A Hard Ai that uses a minimax algorithm with alpha beta pruning to choose
-    a move in a Mancala game.
+    A Hard Ai that uses a minimax algorithm with alpha beta pruning, written
+    as negamax with principal variation search, to choose a move in a
+    Mancala game. Remembers search results in a transposition
+    table kept between moves. Searches to a fixed depth, or with a time limit
+    searches deeper and deeper until the time runs out. Can look up exact
+    values of positions with few seeds left in an endgame database, and
+    plays the first moves of a game from an opening book.
     """
-    def __init__(self, board_obj, player_num):
+    # seconds per move for the Hard Ai in the game
+    GAME_TIME_LIMIT = 1.5
+    # most positions searched while pondering, and the depth they are
+    # sorted by
+    MAX_PONDER_POSITIONS = 24
+    PONDER_ORDER_DEPTH = 2
+    # iterative deepening searches the best move of the last depth first
+    # expecting a rating within this of its last one
+    ASPIRATION_WINDOW = 1
+    # highest rating for a position that is not won, a win is 100
+    MAX_SCORE = 99
+
+    def __init__(self, board_obj, player_num, table_size_mb=16, max_depth=8,
+                 time_limit=None, workers=0, move_ordering=True,
+                 endgame_path=None, stats_hook=None, book_path=None,
+                 features='stores'):
+        """
+        :param table_size_mb: Approximate megabytes for the transposition
+                              table, or 0 to search without one.
+        :param max_depth: Depth to search to, or with a time limit the
+                          deepest iteration to search (None for no limit).
+        :param time_limit: Seconds to search for each move with iterative
+                           deepening, or None to search to max_depth.
+        :param workers: Number of processes to search the root moves in, or
+                        0 or 1 to search them in this process.
+        :param move_ordering: Boolean for if minimax sorts moves with
+                              order_moves before searching them.
+        :param endgame_path: String of an endgame database file to look up
+                             positions in, or None to not use one.
+        :param stats_hook: Function called with the SearchStats of each move
+                           chosen, like SearchStats.logging_hook(), or None
+                           to not collect stats.
+        :param book_path: String of an opening book file to look up moves in
+                          before searching, or None to not use one.
+        :param features: Evaluator, or the name of a feature set in
+                         Evaluation.FEATURE_SETS or a sequence of features
+                         and weights for one, to rate positions with.
+        """
         super().__init__(board_obj, player_num, 'HARD AI')
+        self._table_size_mb = table_size_mb
+        self._table = None
+        if table_size_mb:
+            self._table = TranspositionTable(table_size_mb)
+        self._max_depth = max_depth
+        self._time_limit = time_limit
+        self._workers = workers
+        self._move_ordering = move_ordering
+        if not isinstance(features, Evaluator):
+            features = Evaluator(features)
+        self._evaluator = features
+        self._endgame_path = endgame_path
+        self._endgame = None
+        if endgame_path:
+            self._endgame = EndgameDatabase(endgame_path)
+        # killer moves by (turn, depth), and history scores by turn and pit
+        self._killers = {}
+        self._history = [[0] * 6, [0] * 6]
+        self._pool = None
+        self._shared_alpha = None
+        # set to stop the searches running in the pool workers
+        self._shared_stop = None
+        self._search_id = 0
+        self._deadline = None
+        self._nodes = 0
+        self._depth_limited = False
+        self._completed_depth = 0
+        self._book = OpeningBook(book_path) if book_path else None
+        # stats of the search running, or None when not collecting them
+        self._stats = None
+        self._stats_hook = stats_hook
+        self._last_stats = None
+        self._root_depth = 0
+        # ratings from pondering by position, with the moves and depth
+        self._pondered = {}
 
-    def choose_move(self, MancalaClass):
+    def get_table(self):
+        """
+        :return: TranspositionTable used by the search, or None.
         """
-        Chooses a move for this player using minimax. Helper method that sets
-        up minimax with a copy of the game and board, and gets the pit number
-        of the final choice.
+        return self._table
+
+    def get_nodes(self):
+        """
+        :return: Integer of the positions searched by minimax for the last
+                 move chosen.
+        """
+        return self._nodes
+
+    def get_completed_depth(self):
+        """
+        :return: Integer of the depth of the last search that completed.
+        """
+        return self._completed_depth
+
+    def get_last_stats(self):
+        """
+        :return: SearchStats of the last move chosen while collecting stats,
+                 or None.
+        """
+        return self._last_stats
+
+    def set_stats_hook(self, stats_hook):
+        """
+        :param stats_hook: Function called with the SearchStats of each move
+                           chosen, or None to stop collecting stats.
+        """
+        self._stats_hook = stats_hook
+
+    def choose_move(self, MancalaClass=None, return_stats=False):
+        """
+        Chooses a move for this player using minimax. Collects SearchStats
+        for the move if return_stats is True or there is a stats hook.
+
+        :param MancalaClass: Not used, the search plays moves with
+                             Rules.apply_move. Kept so callers can pass the
+                             game class.
+        :param return_stats: Boolean for if the stats are returned with the
+                             move.
+        :return: Integer of the pit number/move to make, or a tuple of it and
+                 the SearchStats if return_stats is True.
+        """
+        if not return_stats and self._stats_hook is None:
+            return self.search_move()
+
+        stats = self._stats = SearchStats()
+        table = self._table
+        if table is not None:
+            hits, misses = table.hits, table.misses
+        start = time.perf_counter()
+        try:
+            stats.move = self.search_move()
+        finally:
+            self._stats = None
+        stats.seconds = time.perf_counter() - start
+        stats.nodes += self._nodes
+        stats.completed_depth = self._completed_depth
+        if table is not None:
+            stats.table_hits += table.hits - hits
+            stats.table_misses += table.misses - misses
+        self._last_stats = stats
+        if self._stats_hook is not None:
+            self._stats_hook(stats)
+        if return_stats:
+            return stats.move, stats
+        return stats.move
+
+    def search_move(self):
+        """
+        Helper method for choose_move that sets up minimax with the position
+        after each of the player's moves, and gets the pit number of the
+        final choice.
 
         :return: Integer of the pit number/move to make.
         """
         moves = self.get_valid_moves()
         # optimization for 1 move. (will never be called if 0 moves)
         if len(moves) == 1:
+            self._nodes = 0
+            self._completed_depth = 0
             return moves[0]
 
-        depth = 8
+        position = self._board_obj.get_state()
+        if self._book is not None:
+            book_moves = self._book.lookup(position, self._player_num)
+            if book_moves:
+                self._nodes = 0
+                self._completed_depth = 0
+                if self._stats is not None:
+                    self._stats.book_move = True
+                return random.choice(book_moves)
 
-        # make fake game to simulate moves on
-        game = MancalaClass()
-        game.create_player('1')
-        game.create_player('2')
-        # set fake game state equal to current game state with copy of board
-        state = (2, deepcopy(self._board_obj.get_board()), False,
-                 None, False)
-        game.restore_state(state)
+        pondered = self._pondered.get(position)
+        self._pondered = {}
+        if pondered is not None:
+            moves, ratings, self._completed_depth = pondered
+            self._nodes = 0
+            if self._stats is not None:
+                self._stats.pondered = True
+            return self.pick_move(moves, ratings)
 
-        # ratings will store the rating at the same index as its pit in moves
-        ratings = [0] * len(moves)
-        # get the rating for each move
-        for i, move in enumerate(moves):
-            saved = game.copy_state()
-            game.play_game(2, move)
-            cur_eval = self.minimax(game, depth,
-                                    float(-math.inf), float(math.inf))
-            ratings[i] = cur_eval
-            game.restore_state(saved)
+        return self.pick_move(moves, self.search_ratings(position, moves))
+
+    def search_ratings(self, position, moves):
+        """
+        Rates the moves with a new search, to max_depth or with iterative
+        deepening when there is a time limit.
+
+        :param position: BoardState with this player to move.
+        :param moves: List of the pit numbers to rate.
+        :return: List of the rating for each move.
+        """
+        self.new_search()
+        if self._time_limit is None:
+            ratings = self.rate_moves(position, moves, self._max_depth)
+            self._completed_depth = self._max_depth
+            return ratings
+        return self.iterative_deepening(position, moves)
 
+    def pick_move(self, moves, ratings):
+        """
+        :param moves: List of pit numbers.
+        :param ratings: List of the rating for each move.
+        :return: Integer of the pit with the highest rating, picked at random
+                 between equally rated pits.
+        """
         max_idx = [0]
         # finds the index of the pit with the highest rating
         for i in range(1, len(ratings)):
@@ -135,63 +346,550 @@ class HardAi(Ai):
             return moves[max_idx[random.randint(0, (len(max_idx) - 1))]]
         return moves[max_idx[0]]
 
-    def minimax(self, game, depth, alpha, beta):
+    def ponder(self, position):
         """
-        Recursive method that evaluates each move returning the min or max
-        evaluation based on if it's the player's or opponent's turn.
+        Searches the positions the opponent's turn can end in while the
+        opponent decides, the most likely first. Keeps the ratings so
+        choose_move can answer at once when the opponent's turn ends in one
+        of them, and any other is searched faster with the transposition
+        table filled. Runs until every position is searched or request_stop
+        is called, so it is meant to run in another thread like AiWorker.
 
-        :return: Integer for the rating/evaluation of making all possible moves
-                 until the given depth.
+        :param position: BoardState with the opponent to move, after an extra
+                         turn the ratings found for the position before it
+                         that can still be reached are kept.
         """
-        if (depth == 0 or game.get_end_state() or
-                game.get_board_obj().store_has_seeds_to_win()):
-            return self.evaluation(game.get_board())
-        turn = game.get_turn()
-        moves = self.get_valid_moves(turn, game.get_board_obj())
-        if not moves:
-            return self.evaluation(game.get_board())
-
-        # maximising
-        if turn == self._player_num:
-            max_eval = float(-math.inf)
-            for move in moves:
-                saved = game.copy_state()
-                game.play_game(turn, move)
-                cur_eval = self.minimax(game, depth - 1, alpha, beta)
-                game.restore_state(saved)
-                max_eval = max(max_eval, cur_eval)
-                alpha = max(alpha, cur_eval)
-                if beta <= alpha:
+        try:
+            positions = self.ponder_positions(position)
+            self._pondered = {child: self._pondered[child]
+                              for child in positions
+                              if child in self._pondered}
+            for child in positions:
+                if child in self._pondered:
+                    continue
+                moves = get_valid_moves(child, self._player_num)
+                if len(moves) > 1:
+                    ratings = self.search_ratings(child, moves)
+                    self._pondered[child] = (moves, ratings,
+                                             self._completed_depth)
+        except SearchCancelled:
+            pass
+
+    def ponder_positions(self, position):
+        """
+        Lists the positions with this player to move after each way the
+        opponent can play their turn from position, including extra turns.
+        They are sorted by a shallow search so the opponent's best replies
+        come first.
+
+        :param position: BoardState with the opponent to move.
+        :return: List of at most MAX_PONDER_POSITIONS BoardStates.
+        """
+        opponent = 3 - self._player_num
+        found = {}
+        positions = [position]
+        while positions and len(found) < self.MAX_PONDER_POSITIONS:
+            next_positions = []
+            for current in positions:
+                for move in get_valid_moves(current, opponent):
+                    res = apply_move(current, opponent, move)
+                    if res.ended:
+                        continue
+                    if res.turn == opponent:
+                        next_positions.append(res.position)
+                    elif res.position not in found:
+                        found[res.position] = res
+            positions = next_positions
+
+        self.new_search()
+        ratings = {child: self.minimax(res, self.PONDER_ORDER_DEPTH,
+                                       float(-math.inf), float(math.inf))
+                   for child, res in found.items()}
+        # ratings are for this player, so the opponent wants them low
+        return sorted(ratings, key=ratings.get)[:self.MAX_PONDER_POSITIONS]
+
+    def new_search(self):
+        """
+        Resets the node count and killer moves, ages the history scores and
+        starts a new search in the transposition table.
+        """
+        self._nodes = 0
+        self._killers = {}
+        self._history = [[score // 2 for score in side]
+                         for side in self._history]
+        if self._table is not None:
+            self._table.new_search()
+
+    def rate_moves(self, position, moves, depth, order=None, guess=None):
+        """
+        Rates each move by searching the position after it with minimax, in
+        the process pool if there is more than one worker. Once a move is
+        rated, later moves only need to be searched well enough to show they
+        are worse, so they are searched with alpha one below the best rating.
+        Evaluations are integers, so every move rated as high as the best
+        still gets its exact rating and the best moves are the same as with
+        a full search.
+
+        :param position: BoardState with this player to move.
+        :param moves: List of the pit numbers to rate.
+        :param depth: Integer depth to search below each move.
+        :param order: List of indexes into moves in the order to search
+                      them, defaults to the order of moves.
+        :param guess: Integer rating expected for the first move, like its
+                      rating from a shallower search, to search it with an
+                      aspiration window around, or None. Not used in the
+                      process pool.
+        :return: List of the rating for each move, at the same index as its
+                 pit in moves.
+        """
+        if order is None:
+            order = range(len(moves))
+        if self._workers > 1:
+            return self._rate_moves_in_pool(position, moves, depth, order)
+        self._root_depth = depth
+        stats = self._stats
+        ratings = [0] * len(moves)
+        best = float(-math.inf)
+        for i in order:
+            if stats is not None:
+                start = time.perf_counter()
+            if guess is not None:
+                low = guess - self.ASPIRATION_WINDOW
+                high = guess + self.ASPIRATION_WINDOW
+                ratings[i] = self.rate_move(position, moves[i], depth, low,
+                                            high)
+                if not low < ratings[i] < high:
+                    # only a bound, the rating is outside the window
+                    ratings[i] = self.rate_move(position, moves[i], depth)
+                guess = None
+            else:
+                ratings[i] = self.rate_move(position, moves[i], depth,
+                                            best - 1)
+            if stats is not None:
+                stats.root_move_times[moves[i]] = (
+                    stats.root_move_times.get(moves[i], 0.0) +
+                    time.perf_counter() - start)
+            best = max(best, ratings[i])
+        return ratings
+
+    def rate_move(self, position, move, depth, alpha=float(-math.inf),
+                  beta=float(math.inf)):
+        """
+        Rates one move by searching the position after it with minimax.
+
+        :param position: BoardState with this player to move.
+        :param move: The pit number to rate.
+        :param depth: Integer depth to search below the move.
+        :param alpha: Lower bound of the search window. A rating at or below
+                      alpha only shows the move is no better than alpha.
+        :param beta: Upper bound of the search window. A rating at or above
+                     beta only shows the move is at least beta.
+        :return: Integer rating for the move.
+        """
+        child = apply_move(position, self._player_num, move)
+        key = update_key(zobrist_key(position, self._player_num), position,
+                         self._player_num, child)
+        return self.minimax(child, depth, alpha, beta, key)
+
+    def request_stop(self):
+        """
+        Asks a choose_move running in another thread to stop soon by raising
+        SearchCancelled, along with its searches in the pool workers.
+        """
+        super().request_stop()
+        if self._shared_stop is not None:
+            self._shared_stop.value = True
+
+    def clear_stop(self):
+        """
+        Lets choose_move run again after request_stop.
+        """
+        super().clear_stop()
+        if self._shared_stop is not None:
+            self._shared_stop.value = False
+
+    def _get_pool(self):
+        """
+        Creates the process pool the first time it is needed, each worker
+        process has its own HardAi and transposition table kept between
+        moves, shares the best rating so far through _shared_alpha, and
+        stops searching when _shared_stop is set.
+
+        :return: ProcessPoolExecutor for root searches.
+        """
+        if self._pool is None:
+            self._shared_alpha = multiprocessing.Value('d', -math.inf)
+            self._shared_stop = multiprocessing.Value('b', False)
+            self._pool = ProcessPoolExecutor(
+                self._workers, initializer=_init_worker,
+                initargs=(self._player_num, self._table_size_mb,
+                          self._shared_alpha, self._endgame_path,
+                          self._evaluator, self._shared_stop))
+        return self._pool
+
+    def _rate_moves_in_pool(self, position, moves, depth, order):
+        """
+        Sends each root move to the process pool to be rated with
+        _rate_move_in_worker, see rate_moves.
+        """
+        pool = self._get_pool()
+        self._shared_alpha.value = -math.inf
+        self._search_id += 1
+        seeds = position.to_bytes()
+        collect_stats = self._stats is not None
+        futures = [(i, pool.submit(_rate_move_in_worker, seeds, moves[i],
+                                   depth, self._deadline, self._search_id,
+                                   collect_stats))
+                   for i in order]
+        ratings = [0] * len(moves)
+        try:
+            for i, future in futures:
+                while True:
+                    try:
+                        result = future.result(timeout=0.05)
+                        break
+                    except TimeoutError:
+                        if self._stop_requested:
+                            raise SearchCancelled()
+                ratings[i], depth_limited, stats = result
+                self._depth_limited = self._depth_limited or depth_limited
+                if collect_stats:
+                    self._stats.merge(stats)
+        except (SearchTimeout, SearchCancelled) as error:
+            # moves already being searched can't be cancelled, so the workers
+            # are stopped and waited for, otherwise the next search would
+            # queue behind them
+            if isinstance(error, SearchCancelled):
+                self._shared_stop.value = True
+            for _, future in futures:
+                future.cancel()
+            wait([future for _, future in futures])
+            raise
+        return ratings
+
+    def close(self):
+        """
+        Shuts down the process pool if one was started.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def iterative_deepening(self, position, moves):
+        """
+        Rates the moves with searches of depth 1, 2, 3 and so on until the
+        time limit runs out, the search reaches the end of every line, or
+        max_depth is searched. Each search tries the moves in order of their
+        ratings from the one before, the first with an aspiration window
+        around its rating from before, and the transposition table orders
+        the moves below them by the best line found before.
+
+        :param position: BoardState with this player to move.
+        :param moves: List of the pit numbers to rate.
+        :return: List of the ratings from the deepest search that completed.
+        """
+        deadline = time.monotonic() + self._time_limit
+        order = list(range(len(moves)))
+        ratings = None
+        depth = 1
+        try:
+            while self._max_depth is None or depth <= self._max_depth:
+                self._depth_limited = False
+                try:
+                    new_ratings = self.rate_moves(
+                        position, moves, depth, order,
+                        None if ratings is None else ratings[order[0]])
+                except SearchTimeout:
                     break
-            return max_eval
-
-        # minimizing
-        else:
-            min_eval = float(math.inf)
-            for move in moves:
-                saved = game.copy_state()
-                game.play_game(turn, move)
-                cur_eval = self.minimax(game, depth - 1, alpha, beta)
-                game.restore_state(saved)
-                min_eval = min(min_eval, cur_eval)
-                beta = min(beta, cur_eval)
-                if beta <= alpha:
+                ratings = new_ratings
+                self._completed_depth = depth
+                if not self._depth_limited:
                     break
-            return min_eval
+                order.sort(key=lambda i: ratings[i], reverse=True)
+                depth += 1
+                # depth 1 always completes so there is a move to return
+                self._deadline = deadline
+                if time.monotonic() > deadline:
+                    break
+        finally:
+            self._deadline = None
+        return ratings
+
+    def minimax(self, node, depth, alpha, beta, key=None):
+        """
+        Rates node for this player by searching it with negamax to depth,
+        within the window alpha to beta.
+
+        :param node: MoveResult from Rules.apply_move with the position and
+                     the player to move.
+        :param key: Zobrist key of the node, computed if not given.
+        :return: Integer for the rating/evaluation of making all possible moves
+                 until the given depth, higher in favor of this player.
+        """
+        if node.turn == self._player_num:
+            return self.negamax(node, depth, alpha, beta, key)
+        return -self.negamax(node, depth, -beta, -alpha, key)
+
+    def negamax(self, node, depth, alpha, beta, key=None, score=None):
+        """
+        Recursive method that rates node for the player to move, the best
+        rating of their moves being the worst rating of the opponent's
+        replies. The first move is searched with the whole window and the
+        rest with a null window around alpha to show they are no better,
+        searching again with the whole window when one is. A move that gives
+        another turn is rated without changing sides. Uses and updates the
+        transposition table when there is one. The evaluator's score is
+        updated for each move played, so positions at depth 0 are rated
+        without looking at the board.
+
+        :param node: MoveResult from Rules.apply_move with the position and
+                     the player to move.
+        :param depth: Integer depth left to search.
+        :param alpha: Lowest rating the player to move can already get.
+        :param beta: Highest rating the opponent lets the player to move get.
+        :param key: Zobrist key of the node, computed if not given.
+        :param score: Integer score of the node from the evaluator, computed
+                      if not given.
+        :return: Integer rating of node for the player to move. A rating at
+                 or below alpha is an upper bound, and at or above beta a
+                 lower bound.
+        """
+        self._nodes += 1
+        if not self._nodes & 1023:
+            if self._stop_requested or (self._shared_stop is not None and
+                                        self._shared_stop.value):
+                raise SearchCancelled()
+            if (self._deadline is not None and
+                    time.monotonic() > self._deadline):
+                raise SearchTimeout()
+        position = node.position
+        turn = node.turn
+        sign = 1 if turn == self._player_num else -1
+        stats = self._stats
+        if node.ended or position.store_has_seeds_to_win():
+            if stats is not None:
+                stats.record_leaf(self._root_depth - depth + 1)
+            return sign * self.evaluation(position)
+        if self._endgame is not None:
+            margin = self._endgame.probe(position, turn)
+            if margin is not None:
+                if stats is not None:
+                    stats.endgame_hits += 1
+                    stats.record_leaf(self._root_depth - depth + 1)
+                return sign * self.endgame_evaluation(position, turn, margin)
+        evaluator = self._evaluator
+        if score is None:
+            score = evaluator.score(position)
+        if depth == 0:
+            self._depth_limited = True
+            if stats is not None:
+                stats.record_leaf(self._root_depth + 1)
+            # scores are player 1's view, and lower than a win
+            if turn == 2:
+                score = -score
+            return max(-self.MAX_SCORE, min(self.MAX_SCORE, score))
+        moves = self.get_valid_moves(turn, position)
+        if not moves:
+            if stats is not None:
+                stats.record_leaf(self._root_depth - depth + 1)
+            return sign * self.evaluation(position)
+
+        table = self._table
+        table_move = None
+        if table is not None:
+            if key is None:
+                key = zobrist_key(position, turn)
+            entry = table.probe(key)
+            if entry is not None:
+                if entry[1] == depth:
+                    value, bound = entry[2], entry[3]
+                    if bound == LOWER:
+                        alpha = max(alpha, value)
+                    elif bound == UPPER:
+                        beta = min(beta, value)
+                    if bound == EXACT or beta <= alpha:
+                        # the entry's search may have stopped at the depth
+                        # limit, so a deeper search could still change it
+                        self._depth_limited = True
+                        return value
+                table_move = entry[4]
+        if self._move_ordering:
+            moves = self.order_moves(position, turn, moves, depth, table_move)
+        elif table_move in moves:
+            # search the best move found before first
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+        window = (alpha, beta)
+        best_eval = float(-math.inf)
+        best_move = None
+        update = evaluator.update
+
+        for move in moves:
+            child = apply_move(position, turn, move)
+            child_key = (update_key(key, position, turn, child)
+                         if table is not None and depth > 1 else None)
+            child_score = update(score, position, child)
+            again = child.turn == turn
+            if best_move is None:
+                if again:
+                    cur_eval = self.negamax(child, depth - 1, alpha, beta,
+                                            child_key, child_score)
+                else:
+                    cur_eval = -self.negamax(child, depth - 1, -beta, -alpha,
+                                             child_key, child_score)
+            else:
+                # ratings are integers, so this only shows if the move
+                # beats alpha
+                if again:
+                    cur_eval = self.negamax(child, depth - 1, alpha,
+                                            alpha + 1, child_key, child_score)
+                else:
+                    cur_eval = -self.negamax(child, depth - 1, -alpha - 1,
+                                             -alpha, child_key, child_score)
+                if alpha < cur_eval < beta:
+                    if again:
+                        cur_eval = self.negamax(child, depth - 1, alpha,
+                                                beta, child_key, child_score)
+                    else:
+                        cur_eval = -self.negamax(child, depth - 1, -beta,
+                                                 -alpha, child_key,
+                                                 child_score)
+            if cur_eval > best_eval:
+                best_eval, best_move = cur_eval, move
+                if cur_eval > alpha:
+                    alpha = cur_eval
+                    if alpha >= beta:
+                        self.record_cutoff(turn, move, depth,
+                                           move == moves[0])
+                        break
+
+        if table is not None:
+            if best_eval <= window[0]:
+                bound = UPPER
+            elif best_eval >= window[1]:
+                bound = LOWER
+            else:
+                bound = EXACT
+            table.store(key, depth, best_eval, bound, best_move)
+        return best_eval
+
+    def order_moves(self, position, turn, moves, depth, first=None):
+        """
+        Sorts moves so the ones most likely to be best are searched first,
+        letting alpha beta prune more: first, then moves whose last seed lands
+        in the store for another turn (closest to the store first), captures
+        (biggest first), killer moves that caused a cutoff at the same depth,
+        and then the rest by history score.
+
+        :param position: BoardState with turn to move.
+        :param turn: The player to move (1 or 2).
+        :param moves: List of the valid pit numbers.
+        :param depth: Integer depth left to search.
+        :param first: Pit number to search first, such as the best move from
+                      the transposition table, or None.
+        :return: New list of the moves in the order to search them.
+        """
+        seeds = position.to_bytes()
+        own = (turn - 1) * 7
+        store = own + 6
+        sowing = SOWING_TABLE[turn - 1]
+        killers = self._killers.get((turn, depth), ())
+        history = self._history[turn - 1]
+
+        def score(move):
+            if move == first:
+                return 5, 0
+            amount = seeds[own + move - 1]
+            if amount <= MAX_TABLE_SEEDS:
+                last = sowing[move - 1][amount][0]
+            else:
+                last = get_sowing(turn, move, amount)[0]
+            if last == store:
+                return 4, move
+            if amount == 13:
+                # lands back in the emptied pit, opposite gets a seed
+                return 3, seeds[OPPOSITE_SLOT[last]] + 1
+            if (amount < 13 and own <= last < store and not seeds[last] and
+                    seeds[OPPOSITE_SLOT[last]]):
+                return 3, seeds[OPPOSITE_SLOT[last]]
+            if move in killers:
+                return 2, 0
+            return 1, history[move - 1]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def record_cutoff(self, turn, move, depth, first_move=False):
+        """
+        Remembers a move that caused a beta cutoff as a killer move for the
+        depth, and adds to its history score.
+
+        :param turn: The player who played the move (1 or 2).
+        :param move: The pit number of the move.
+        :param depth: Integer depth left to search when it was played.
+        :param first_move: Boolean for if it was the first move searched,
+                           for the stats.
+        """
+        if self._stats is not None:
+            self._stats.cutoffs += 1
+            if first_move:
+                self._stats.first_move_cutoffs += 1
+        killers = self._killers.setdefault((turn, depth), [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self._history[turn - 1][move - 1] += depth * depth
 
     def evaluation(self, board):
         """
         Evaluates board, returning a higher integer for boards in favor of
-        the player.
+        the player. Boards where the game is decided are rated by the stores
+        and the rest by the evaluator.
 
+        :param board: Board or BoardState object to evaluate.
         :return: Integer representing the state of the board with higher
                  results being in favor of this player.
         """
         opponent_num = 1
         if self._player_num == 1:
             opponent_num = 2
-        opponent_store = board[opponent_num - 1][6]
-        player_store = board[self._player_num - 1][6]
+        player_store = board.get_seeds_in_store(self._player_num)
+        opponent_store = board.get_seeds_in_store(opponent_num)
+        if (player_store > 24 or opponent_store > 24 or
+                player_store + opponent_store == 48):
+            return self.score_stores(player_store, opponent_store)
+        score = self._evaluator.score(board.get_state())
+        if self._player_num == 2:
+            score = -score
+        return max(-self.MAX_SCORE, min(self.MAX_SCORE, score))
+
+    def endgame_evaluation(self, position, turn, margin):
+        """
+        Evaluates position from the stores at the end of the game, when both
+        players play their best from position.
+
+        :param position: BoardState with turn to move.
+        :param turn: The player to move (1 or 2).
+        :param margin: Integer from EndgameDatabase.probe, the seeds turn
+                       gets into their store from now on minus what the
+                       opponent gets.
+        :return: Integer evaluation of the final stores like evaluation.
+        """
+        stores = [position.get_seeds_in_store(1),
+                  position.get_seeds_in_store(2)]
+        remaining = sum(position) - stores[0] - stores[1]
+        gained = (remaining + margin) // 2
+        stores[turn - 1] += gained
+        stores[2 - turn] += remaining - gained
+        return self.score_stores(stores[self._player_num - 1],
+                                 stores[2 - self._player_num])
+
+    def score_stores(self, player_store, opponent_store):
+        """
+        :param player_store: Seeds in this player's store.
+        :param opponent_store: Seeds in the opponent's store.
+        :return: Integer representing the stores with higher results being
+                 in favor of this player, 100 or -100 once a player has won.
+        """
         if player_store > 24:
             return 100
         if opponent_store > 24:
@@ -201,6 +899,65 @@ class HardAi(Ai):
         return player_store - opponent_store
 
 
+# the HardAi, shared alpha and last search id of a pool worker process
+_worker = None
+
+
+def _init_worker(player_num, table_size_mb, shared_alpha, endgame_path=None,
+                 features='stores', shared_stop=None):
+    """
+    Sets up a process pool worker for HardAi root searches.
+    """
+    global _worker
+    ai = HardAi(None, player_num, table_size_mb, endgame_path=endgame_path,
+                features=features)
+    # the searches stop when the HardAi using the pool is asked to stop
+    ai._shared_stop = shared_stop
+    _worker = [ai, shared_alpha, None]
+
+
+def _rate_move_in_worker(seeds, move, depth, deadline, search_id,
+                         collect_stats=False):
+    """
+    Rates a root move in a pool worker, starting with alpha one below the
+    best rating the other workers have found, and sharing its rating.
+
+    :return: Tuple of the rating, if the search was cut off by depth, and the
+             SearchStats of the move's search or None.
+    """
+    ai, shared_alpha, last_search = _worker
+    table = ai.get_table()
+    if search_id != last_search:
+        _worker[2] = search_id
+        if table is not None:
+            table.new_search()
+    ai._deadline = deadline
+    ai._depth_limited = False
+    stats = None
+    if collect_stats:
+        stats = ai._stats = SearchStats()
+        ai._nodes = 0
+        ai._root_depth = depth
+        if table is not None:
+            hits, misses = table.hits, table.misses
+        start = time.perf_counter()
+    try:
+        rating = ai.rate_move(BoardState(seeds), move, depth,
+                              shared_alpha.value)
+    finally:
+        ai._stats = None
+    if collect_stats:
+        stats.root_move_times[move] = time.perf_counter() - start
+        stats.nodes = ai._nodes
+        if table is not None:
+            stats.table_hits = table.hits - hits
+            stats.table_misses = table.misses - misses
+    with shared_alpha.get_lock():
+        if rating - 1 > shared_alpha.value:
+            shared_alpha.value = rating - 1
+    return rating, ai._depth_limited, stats
+
+
 class EasyAi(Ai):
     """
     An Easy Ai i that chooses moves randomly based on a Mancala board.
@@ -218,3 +975,183 @@ class EasyAi(Ai):
         moves = self.get_valid_moves()
         idx = random.randint(0, len(moves) - 1)
         return moves[idx]
+
+
+class MctsNode:
+    """
+    A position in a MctsAi search tree. Stats are from the point of view of
+    the player who made the move into the node, so extra turns need no
+    special handling.
+    """
+    __slots__ = ('position', 'turn', 'ended', 'parent', 'move', 'children',
+                 'untried', 'visits', 'wins')
+
+    def __init__(self, position, turn, ended=False, parent=None, move=None):
+        """
+        :param position: BoardState of the node.
+        :param turn: The player to move (1 or 2).
+        :param ended: Boolean for if the game is over.
+        :param parent: MctsNode the move was played from, or None.
+        :param move: Integer pit number played from parent, or None.
+        """
+        self.position = position
+        self.turn = turn
+        self.ended = ended
+        self.parent = parent
+        self.move = move
+        self.children = []
+        self.untried = [] if ended else get_valid_moves(position, turn)
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MctsAi(Ai):
+    """
+    An Ai that uses Monte Carlo tree search (UCT) with random playouts to
+    choose a move. Searches for a number of playouts or seconds, and
+    keeps the tree between its moves in the same game.
+    """
+    # seconds per move for the MCTS Ai in the game
+    GAME_TIME_LIMIT = 1.0
+    DEFAULT_PLAYOUTS = 2000
+
+    def __init__(self, board_obj, player_num, playouts=None, time_limit=None,
+                 exploration=math.sqrt(2)):
+        """
+        :param playouts: Number of playouts for each move.
+        :param time_limit: Seconds to search for each move, like for HardAi,
+                           used instead of playouts if given.
+        :param exploration: UCT exploration constant.
+        """
+        super().__init__(board_obj, player_num, 'MCTS AI')
+        if playouts is None and time_limit is None:
+            playouts = self.DEFAULT_PLAYOUTS
+        self._playouts = playouts
+        self._time_limit = time_limit
+        self._exploration = exploration
+        self._root = None
+        self._last_playouts = 0
+
+    def get_root(self):
+        """
+        :return: MctsNode of the tree kept from the last move, or None.
+        """
+        return self._root
+
+    def get_playouts(self):
+        """
+        :return: Integer of the playouts run for the last move chosen.
+        """
+        return self._last_playouts
+
+    def choose_move(self, MancalaClass=None):
+        """
+        Chooses a move for this player with MCTS, picking the move that was
+        visited the most.
+
+        :param MancalaClass: Not used, kept so callers can pass the game
+                             class like for HardAi.
+        :return: Integer of the pit number/move to make.
+        """
+        moves = self.get_valid_moves()
+        if len(moves) == 1:
+            return moves[0]
+
+        root = self.find_root(self._board_obj.get_state())
+        deadline = None
+        if self._time_limit is not None:
+            deadline = time.monotonic() + self._time_limit
+        playouts = 0
+        # at least one playout, so a new root has a child to pick
+        while playouts == 0 or (playouts < self._playouts if deadline is None
+                                else time.monotonic() < deadline):
+            if self._stop_requested:
+                raise SearchCancelled()
+            self.search(root)
+            playouts += 1
+        self._last_playouts = playouts
+
+        most = max(child.visits for child in root.children)
+        best = random.choice([child for child in root.children
+                              if child.visits == most])
+        # keep the subtree of the move for the next search
+        best.parent = None
+        self._root = best
+        return best.move
+
+    def find_root(self, position):
+        """
+        Finds position with this player to move in the tree kept from the
+        last move, so the playouts already run below it are reused.
+
+        :param position: BoardState of the current position.
+        :return: MctsNode to search from, a new one if position is not in the
+                 kept tree.
+        """
+        nodes = [self._root] if self._root is not None else []
+        # the opponent's replies, including any extra turns
+        for _ in range(4):
+            for node in nodes:
+                if node.turn == self._player_num and node.position == position:
+                    node.parent = None
+                    self._root = node
+                    return node
+            nodes = [child for node in nodes for child in node.children]
+        self._root = MctsNode(position, self._player_num)
+        return self._root
+
+    def search(self, root):
+        """
+        Runs one playout: selects a path down the tree with UCT, expands one
+        new node, plays random moves to the end of the game, and adds the
+        result to the nodes on the path.
+
+        :param root: MctsNode to search from.
+        """
+        node = root
+        log_visits = 0.0
+        # selection
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            exploration = self._exploration
+            node = max(node.children, key=lambda child: (
+                    child.wins / child.visits +
+                    exploration * math.sqrt(log_visits / child.visits)))
+        # expansion
+        if node.untried:
+            move = node.untried.pop(random.randrange(len(node.untried)))
+            res = apply_move(node.position, node.turn, move)
+            child = MctsNode(res.position, res.turn, res.ended, node, move)
+            node.children.append(child)
+            node = child
+        # playout and backpropagation
+        winner = self.playout(node)
+        while node is not None:
+            node.visits += 1
+            if node.parent is not None:
+                mover = node.parent.turn
+                if winner == mover:
+                    node.wins += 1
+                elif winner == 0:
+                    node.wins += 0.5
+            node = node.parent
+
+    def playout(self, node):
+        """
+        Plays random moves from node to the end of the game.
+
+        :param node: MctsNode to start from.
+        :return: Integer of the winning player number, or 0 for a tie.
+        """
+        position = node.position
+        turn = node.turn
+        ended = node.ended
+        while not ended:
+            moves = get_valid_moves(position, turn)
+            res = apply_move(position, turn, random.choice(moves))
+            position, turn, ended = res.position, res.turn, res.ended
+        store1 = position.get_seeds_in_store(1)
+        store2 = position.get_seeds_in_store(2)
+        if store1 == store2:
+            return 0
+        return 1 if store1 > store2 else 2
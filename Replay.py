@@ -0,0 +1,204 @@
+import argparse
+import os
+import random
+import time
+
+# renders without a window, so it runs on servers with no display. Set before
+# Gui is imported, since it starts pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from Gui import W_HEIGHT, W_WIDTH, EndScreen, GameScreen, SEED_DELAY
+from Mancala import Mancala
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_NAMES = ('PLAYER 1', 'PLAYER 2')
+
+
+def random_moves(seed=None):
+    """
+    Plays a game of random moves to record.
+
+    :param seed: Seed for the random moves, or None.
+    :return: List of the pit numbers played, in order.
+    """
+    rng = random.Random(seed)
+    game = Mancala()
+    game.create_player(DEFAULT_NAMES[0])
+    game.create_player(DEFAULT_NAMES[1])
+    moves = []
+    while not game.get_end_state():
+        turn = game.get_turn()
+        pit = rng.choice(game.get_board_obj().get_pits_with_seeds(turn))
+        game.play_game(turn, pit)
+        moves.append(pit)
+    return moves
+
+
+def read_moves(path):
+    """
+    Reads a recorded game, the pit numbers played in order separated by
+    whitespace. Each move is made by the player whose turn it is, so extra
+    turns need no marking.
+
+    :param path: String of the file to read.
+    :return: List of the pit numbers played.
+    """
+    with open(path) as file:
+        return [int(pit) for pit in file.read().split()]
+
+
+def replay_frames(moves, names=DEFAULT_NAMES, every_seed=True,
+                  end_screen=True):
+    """
+    Plays a recorded game on a GameScreen, without waiting between the
+    seeds, and yields the screen after each frame is drawn. The same surface
+    is yielded every time, so it must be saved or copied before the next
+    frame is asked for.
+
+    :param moves: Sequence of the pit numbers played, in order.
+    :param names: Tuple of the strings of player 1's and player 2's names.
+    :param every_seed: If each seed sown is a frame, otherwise only the
+                       board after each move is.
+    :param end_screen: If the end screen is the last frame once the game has
+                       ended.
+    :return: Generator of pygame.Surface.
+    """
+    screen = pygame.display.set_mode((W_WIDTH, W_HEIGHT))
+    game_screen = GameScreen(screen, 0)
+    # highlights the pits of the player to move on both sides
+    game_screen.set_mode('TWO')
+    game = Mancala(game_screen)
+    game.create_player(names[0])
+    game.create_player(names[1])
+    game_screen.start(*names)
+    yield screen
+
+    for index, pit in enumerate(moves):
+        turn = game.get_turn()
+        if (game.get_end_state() or
+                pit not in game.get_board_obj().get_pits_with_seeds(turn)):
+            raise ValueError(f'move {index + 1}: player {turn} can not play '
+                             f'pit {pit}')
+        # the changes from the last move are cleared first, like the Ai does
+        for hole in list(game_screen.get_pits_changed()):
+            game_screen.remove_change_display(hole)
+        for hole in game_screen.pits[turn - 1]:
+            hole.can_select = False
+            game_screen.update(hole)
+        game.play_game(turn, pit)
+        if not game.get_end_state():
+            game_screen.display_turn(game.get_player_obj().get_name(),
+                                     game.get_turn())
+        if every_seed:
+            while game_screen.step_animation():
+                yield screen
+        else:
+            game_screen.skip_animation()
+            yield screen
+
+    if end_screen and game.get_end_state():
+        EndScreen(screen).start(game.return_winner(), *game.get_stores())
+        yield screen
+
+
+def scaled(surface, scale):
+    """
+    :return: pygame.Surface of surface resized by scale, or surface itself
+             if scale is 1.
+    """
+    if scale == 1:
+        return surface
+    return pygame.transform.smoothscale(
+        surface, (round(surface.get_width() * scale),
+                  round(surface.get_height() * scale)))
+
+
+def save_png_sequence(frames, directory, scale=1):
+    """
+    Saves each frame to directory as frame0000.png, frame0001.png and so on.
+
+    :param frames: Iterable of pygame.Surface, like from replay_frames.
+    :param directory: String of the directory to write to, made if needed.
+    :param scale: Number to resize the frames by.
+    :return: Integer of the frames saved.
+    """
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for count, frame in enumerate(frames, 1):
+        pygame.image.save(scaled(frame, scale),
+                          os.path.join(directory, f'frame{count - 1:04d}.png'))
+    return count
+
+
+def save_gif(frames, path, frame_ms=SEED_DELAY, scale=1):
+    """
+    Saves the frames as an animated GIF. Needs Pillow.
+
+    :param frames: Iterable of pygame.Surface, like from replay_frames.
+    :param path: String of the file to write.
+    :param frame_ms: Integer milliseconds each frame is shown for.
+    :param scale: Number to resize the frames by.
+    :return: Integer of the frames saved.
+    """
+    if Image is None:
+        raise ImportError('saving a GIF needs Pillow (pip install pillow)')
+    images = []
+    for frame in frames:
+        frame = scaled(frame, scale)
+        # kept as palette images, a third of the memory of RGB ones
+        images.append(Image.frombytes(
+            'RGB', frame.get_size(), pygame.image.tobytes(frame, 'RGB'))
+            .quantize())
+    images[0].save(path, save_all=True, append_images=images[1:],
+                   duration=frame_ms, loop=0)
+    return len(images)
+
+
+def main():
+    """Renders a replay of a recorded game from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Render a recorded Mancala game without a display, to a '
+                    'directory of PNG frames or to a GIF.')
+    parser.add_argument('output', nargs='?',
+                        help='directory for PNG frames, or a .gif file; '
+                             'nothing is saved if left out, for timing')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--moves', help='file of the pits played in order')
+    source.add_argument('--seed', type=int,
+                        help='seed of a random game to play instead')
+    parser.add_argument('--names', nargs=2, default=DEFAULT_NAMES,
+                        metavar=('PLAYER1', 'PLAYER2'))
+    parser.add_argument('--per-move', action='store_true',
+                        help='one frame per move instead of per seed')
+    parser.add_argument('--frame-ms', type=int, default=SEED_DELAY,
+                        help='milliseconds each GIF frame is shown for')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='factor to resize the frames by')
+    args = parser.parse_args()
+
+    if args.moves:
+        moves = read_moves(args.moves)
+    else:
+        moves = random_moves(args.seed)
+    frames = replay_frames(moves, tuple(args.names), not args.per_move)
+
+    start = time.perf_counter()
+    if args.output is None:
+        count = sum(1 for _ in frames)
+    elif args.output.lower().endswith('.gif'):
+        count = save_gif(frames, args.output, args.frame_ms, args.scale)
+    else:
+        count = save_png_sequence(frames, args.output, args.scale)
+    seconds = time.perf_counter() - start
+    print(f'{count} frames of {len(moves)} moves in {seconds:.2f}s '
+          f'({count / seconds:.1f} frames/s)')
+
+
+if __name__ == '__main__':
+    main()
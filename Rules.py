@@ -0,0 +1,105 @@
+from Board import (BoardState, MAX_TABLE_SEEDS, OPPOSITE_SLOT, SOWING_TABLE,
+                   get_sowing)
+
+
+class MoveResult:
+    """
+    The result of playing a move with apply_move. Holds the new position,
+    the player to move next, and what happened during the move: if the
+    player gets another turn, the seeds captured, if the game ended, and the
+    list of changes made to each slot in the order they happened.
+    """
+    __slots__ = ('position', 'turn', 'extra_turn', 'captured', 'ended',
+                 'changes')
+
+    def __init__(self, position, turn, extra_turn=False, captured=0,
+                 ended=False, changes=()):
+        self.position = position
+        self.turn = turn
+        self.extra_turn = extra_turn
+        self.captured = captured
+        self.ended = ended
+        self.changes = changes
+
+
+def get_valid_moves(position, turn):
+    """
+    :param position: BoardState or sequence of 14 integers in flat order.
+    :param turn: The player number (1 or 2).
+    :return: List of the pit numbers (1-6) on turn's side that have seeds.
+    """
+    start = (turn - 1) * 7
+    return [i + 1 for i in range(6) if position[start + i]]
+
+
+def apply_move(position, turn, pit):
+    """
+    Plays pit for the player turn on position, without changing position.
+    Sows the seeds, then checks for special rule 1 (last seed in the
+    player's store gives another turn) and special rule 2 (last seed in an
+    empty pit on the player's side captures the opposite pit). The game ends
+    when the player to move next has no seeds on their side, and the seeds
+    left on the other side go to that side's store. Does not validate the
+    move, the pit must have seeds.
+
+    :param position: BoardState or sequence of 14 integers in flat order.
+    :param turn: The player number (1 or 2).
+    :param pit: The pit number (1-6).
+    :return: MoveResult for the move.
+    """
+    seeds = list(position)
+    own = (turn - 1) * 7
+    store = own + 6
+    opponent = 7 - own
+
+    # pick up the seeds in the pit
+    start = own + pit - 1
+    amount = seeds[start]
+    seeds[start] = 0
+    changes = [(start, -amount)]
+
+    # look up the slots sown and where the last seed lands
+    if amount <= MAX_TABLE_SEEDS:
+        last, added = SOWING_TABLE[turn - 1][pit - 1][amount]
+    else:
+        last, added = get_sowing(turn, pit, amount)
+    for index, count in added:
+        seeds[index] += count
+    changes.extend(added)
+
+    # special rules
+    extra_turn = last == store
+    captured = 0
+    if own <= last < store and seeds[last] == 1:
+        opposite = OPPOSITE_SLOT[last]
+        captured = seeds[opposite]
+        if captured:
+            seeds[opposite] = 0
+            seeds[last] = 0
+            seeds[store] += captured + 1
+            changes += [(opposite, -captured), (last, -1),
+                        (store, captured + 1)]
+
+    # end of game, the remaining seeds go to the store on their side
+    ended = True
+    if not any(seeds[own:store]):
+        sweep = opponent
+    elif not extra_turn and not any(seeds[opponent:opponent + 6]):
+        sweep = own
+    else:
+        ended = False
+    if ended:
+        extra_turn = False
+        total = 0
+        for index in range(sweep, sweep + 6):
+            if seeds[index]:
+                total += seeds[index]
+                changes.append((index, -seeds[index]))
+                seeds[index] = 0
+        if total:
+            seeds[sweep + 6] += total
+            changes.append((sweep + 6, total))
+
+    next_turn = turn if extra_turn else 3 - turn
+    return MoveResult(BoardState(seeds), next_turn, extra_turn, captured,
+                      ended, changes)
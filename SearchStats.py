@@ -0,0 +1,140 @@
+import logging
+
+
+class SearchStats:
+    """
+    Statistics about one HardAi.choose_move search, to see where the time
+    goes and tune the depth. Counts are for the whole move, adding up every
+    iteration of iterative deepening and every pool worker.
+    """
+
+    def __init__(self):
+        self.move = None
+        self.seconds = 0.0
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.max_ply = 0
+        self.completed_depth = 0
+        # seconds spent searching below each root move, by pit number
+        self.root_move_times = {}
+        self.table_hits = 0
+        self.table_misses = 0
+        self.endgame_hits = 0
+        # if the move was played from the opening book without searching
+        self.book_move = False
+        # if the move was played from the ratings found while pondering
+        self.pondered = False
+
+    def record_leaf(self, ply):
+        """
+        Counts a position evaluated without searching below it.
+
+        :param ply: Integer of the moves played from the root to reach it.
+        """
+        self.leaf_evaluations += 1
+        if ply > self.max_ply:
+            self.max_ply = ply
+
+    def first_move_cutoff_rate(self):
+        """
+        :return: Float of the fraction of beta cutoffs caused by the first
+                 move searched, how well the moves are ordered.
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def effective_branching_factor(self):
+        """
+        :return: Float of the branching factor a tree of completed_depth + 1
+                 plies (counting the root moves) would need to have nodes
+                 nodes, or 0.0 if nothing was searched.
+        """
+        if not self.nodes or not self.completed_depth:
+            return 0.0
+        return self.nodes ** (1 / (self.completed_depth + 1))
+
+    def table_hit_rate(self):
+        """
+        :return: Float of the fraction of transposition table probes that
+                 found an entry, or None if the table was not used.
+        """
+        probes = self.table_hits + self.table_misses
+        return self.table_hits / probes if probes else None
+
+    def merge(self, other):
+        """
+        Adds the counts from other, the stats of part of the same search, like
+        a root move searched in a pool worker.
+
+        :param other: SearchStats to add.
+        """
+        self.nodes += other.nodes
+        self.leaf_evaluations += other.leaf_evaluations
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.max_ply = max(self.max_ply, other.max_ply)
+        for move, seconds in other.root_move_times.items():
+            self.root_move_times[move] = (
+                self.root_move_times.get(move, 0.0) + seconds)
+        self.table_hits += other.table_hits
+        self.table_misses += other.table_misses
+        self.endgame_hits += other.endgame_hits
+
+    def as_dict(self):
+        """
+        :return: Dictionary of every statistic, for logging as JSON.
+        """
+        return {
+            'move': self.move,
+            'seconds': self.seconds,
+            'nodes': self.nodes,
+            'nodes_per_second': (self.nodes / self.seconds
+                                 if self.seconds else 0.0),
+            'leaf_evaluations': self.leaf_evaluations,
+            'cutoffs': self.cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate(),
+            'effective_branching_factor': self.effective_branching_factor(),
+            'max_ply': self.max_ply,
+            'completed_depth': self.completed_depth,
+            'root_move_times': dict(self.root_move_times),
+            'table_hit_rate': self.table_hit_rate(),
+            'endgame_hits': self.endgame_hits,
+            'book_move': self.book_move,
+            'pondered': self.pondered,
+        }
+
+    def __str__(self):
+        if self.book_move:
+            return f'move {self.move} from the opening book'
+        if self.pondered:
+            return (f'move {self.move} from pondering to depth '
+                    f'{self.completed_depth}')
+        hit_rate = self.table_hit_rate()
+        return (f'move {self.move} in {self.seconds * 1000:.1f}ms: '
+                f'{self.nodes} nodes, {self.leaf_evaluations} leaves, '
+                f'{self.cutoffs} cutoffs '
+                f'({self.first_move_cutoff_rate():.0%} first move), '
+                f'ebf {self.effective_branching_factor():.2f}, '
+                f'depth {self.completed_depth} (max ply {self.max_ply}), '
+                f'table hits '
+                f'{"-" if hit_rate is None else f"{hit_rate:.0%}"}, '
+                f'endgame hits {self.endgame_hits}')
+
+
+def logging_hook(logger=None, level=logging.INFO):
+    """
+    Makes a stats hook for HardAi that logs each move's stats.
+
+    :param logger: logging.Logger to log to, defaults to the logger for this
+                   module.
+    :param level: Logging level of the messages.
+    :return: Function taking a SearchStats.
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+
+    def hook(stats):
+        logger.log(level, '%s', stats)
+
+    return hook
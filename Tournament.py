@@ -0,0 +1,293 @@
+import argparse
+import ast
+import itertools
+import json
+import math
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from Mancala import Mancala
+
+# a player in the tournament, code is the Ai difficulty passed to
+# Mancala.create_player and options are its keyword arguments
+Entrant = namedtuple('Entrant', ('name', 'code', 'options'))
+
+DEFAULT_ENTRANTS = (
+    Entrant('easy', -1, {}),
+    Entrant('hard-2', -2, {'max_depth': 2, 'time_limit': None}),
+    Entrant('hard-4', -2, {'max_depth': 4, 'time_limit': None}),
+    Entrant('mcts-200', -3, {'playouts': 200, 'time_limit': None}),
+)
+
+# files the Hard Ai reads, not used unless an entrant names them, so the
+# ratings don't depend on the directory the tournament is run from
+HARD_AI_FILES = {'endgame_path': None, 'book_path': None}
+
+# Elo of a player who scores 10 times as much as another is 400 higher
+ELO_SCALE = 400 / math.log(10)
+
+# result of one game, first and second are entrant indices with first
+# moving first, winner is 1, 2 or 0 for a tie, and think times are the total
+# seconds and moves for the player moving first then second
+GameResult = namedtuple('GameResult', ('first', 'second', 'winner',
+                                       'think_time', 'moves'))
+
+
+def parse_entrant(text):
+    """
+    Reads an entrant from the command line, written as the name, the Ai
+    difficulty and any options, like hard-6=-2,max_depth=6,time_limit=None.
+
+    :param text: String of the entrant.
+    :return: Entrant
+    """
+    name, _, spec = text.partition('=')
+    code, *options = spec.split(',')
+    settings = {}
+    for option in options:
+        key, _, value = option.partition('=')
+        settings[key] = ast.literal_eval(value)
+    entrant = Entrant(name, int(code), settings)
+    if settings and entrant.code not in (-2, -3):
+        raise ValueError(f'{name}: only the hard and MCTS Ais take options')
+    return entrant
+
+
+def entrant_options(entrant):
+    """
+    :param entrant: Entrant
+    :return: Dictionary of the keyword arguments the entrant's Ai is created
+             with, its options with the Hard Ai's files left out unless they
+             are given.
+    """
+    if entrant.code == -2:
+        return {**HARD_AI_FILES, **entrant.options}
+    return dict(entrant.options)
+
+
+def schedule(entrant_count, games_per_pair):
+    """
+    Lists the games of a round-robin tournament, each pair of entrants plays
+    games_per_pair games taking turns moving first.
+
+    :return: List of tuples of the entrant indices moving first and second.
+    """
+    games = []
+    for i, j in itertools.combinations(range(entrant_count), 2):
+        for game in range(games_per_pair):
+            games.append((i, j) if game % 2 == 0 else (j, i))
+    return games
+
+
+def play_match_game(entrants, first, second, seed):
+    """
+    Plays one game without a gui, entrant first as player 1.
+
+    :param entrants: Sequence of Entrants.
+    :param first: Index of the entrant moving first.
+    :param second: Index of the entrant moving second.
+    :param seed: Integer seed for the random module, so games can be
+                 replayed.
+    :return: GameResult
+    """
+    random.seed(seed)
+    game = Mancala()
+    players = [game.create_player(entrants[index].code,
+                                  **entrant_options(entrants[index]))
+               for index in (first, second)]
+    think_time = [0.0, 0.0]
+    moves = [0, 0]
+    while not game.get_end_state():
+        turn = game.get_turn()
+        start = time.perf_counter()
+        move = game.get_player_obj().choose_move()
+        think_time[turn - 1] += time.perf_counter() - start
+        moves[turn - 1] += 1
+        game.play_game(turn, move)
+    for player in players:
+        if hasattr(player, 'close'):
+            player.close()
+    winner = game.get_winner()
+    return GameResult(first, second, 0 if winner == 'tie' else winner,
+                      tuple(think_time), tuple(moves))
+
+
+def _play_game_task(args):
+    return play_match_game(*args)
+
+
+def play_tournament(entrants, games_per_pair=10, workers=None, seed=0):
+    """
+    Plays a round-robin tournament between entrants, in a process pool when
+    workers is more than 1.
+
+    :param entrants: Sequence of Entrants.
+    :param games_per_pair: Games each pair of entrants plays.
+    :param workers: Number of processes, None for one per cpu, or 0 or 1 to
+                    play in this process.
+    :param seed: Integer seed, game i is played with seed + i.
+    :return: Tuple of the list of GameResults and the seconds taken.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    tasks = [(entrants, first, second, seed + i)
+             for i, (first, second) in
+             enumerate(schedule(len(entrants), games_per_pair))]
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_play_game_task, tasks))
+    else:
+        results = [play_match_game(*task) for task in tasks]
+    return results, time.perf_counter() - start
+
+
+def fit_elo(entrant_count, results, iterations=200):
+    """
+    Fits Bradley-Terry ratings to results with the MM algorithm, ties
+    counting half a win. Each pair that played also gets one virtual tie so
+    a player who lost every game still has a finite rating.
+
+    :param entrant_count: Number of entrants.
+    :param results: Sequence of GameResults.
+    :param iterations: Number of MM iterations.
+    :return: List of Elo ratings in entrant order, averaging 0.
+    """
+    points = [0.0] * entrant_count
+    played = [[0] * entrant_count for _ in range(entrant_count)]
+    for res in results:
+        played[res.first][res.second] += 1
+        played[res.second][res.first] += 1
+        if res.winner == 1:
+            points[res.first] += 1
+        elif res.winner == 2:
+            points[res.second] += 1
+        else:
+            points[res.first] += 0.5
+            points[res.second] += 0.5
+    for i, j in itertools.combinations(range(entrant_count), 2):
+        if played[i][j]:
+            played[i][j] += 1
+            played[j][i] += 1
+            points[i] += 0.5
+            points[j] += 0.5
+
+    strength = [1.0] * entrant_count
+    for _ in range(iterations):
+        for i in range(entrant_count):
+            total = sum(played[i][j] / (strength[i] + strength[j])
+                        for j in range(entrant_count) if played[i][j])
+            if total:
+                strength[i] = points[i] / total
+        mean = sum(math.log(value) for value in strength) / entrant_count
+        strength = [value / math.exp(mean) for value in strength]
+    return [ELO_SCALE * math.log(value) for value in strength]
+
+
+def elo_intervals(entrant_count, results, samples=200, confidence=0.95,
+                  seed=0):
+    """
+    Estimates confidence intervals for fit_elo by refitting the ratings to
+    games resampled with replacement.
+
+    :return: List of tuples of the low and high Elo of each entrant.
+    """
+    rng = random.Random(seed)
+    fits = [fit_elo(entrant_count, rng.choices(results, k=len(results)))
+            for _ in range(samples)]
+    tail = (1 - confidence) / 2
+    intervals = []
+    for i in range(entrant_count):
+        ratings = sorted(fit[i] for fit in fits)
+        intervals.append((ratings[int(tail * (samples - 1))],
+                          ratings[int((1 - tail) * (samples - 1))]))
+    return intervals
+
+
+def summarize(entrants, results, seconds):
+    """
+    :param entrants: Sequence of Entrants.
+    :param results: List of GameResults from play_tournament.
+    :param seconds: Seconds the tournament took.
+    :return: Dictionary of the games played, games per second, and for each
+             entrant the options its Ai was created with, its games, score,
+             Elo with confidence interval and average think time per move.
+    """
+    count = len(entrants)
+    ratings = fit_elo(count, results)
+    intervals = elo_intervals(count, results)
+    games = [0] * count
+    points = [0.0] * count
+    think_time = [0.0] * count
+    moves = [0] * count
+    for res in results:
+        for side, index in enumerate((res.first, res.second)):
+            games[index] += 1
+            think_time[index] += res.think_time[side]
+            moves[index] += res.moves[side]
+            if res.winner == side + 1:
+                points[index] += 1
+            elif res.winner == 0:
+                points[index] += 0.5
+    players = []
+    for i, entrant in enumerate(entrants):
+        players.append({
+            'name': entrant.name,
+            'options': entrant_options(entrant),
+            'games': games[i],
+            'score': points[i] / games[i] if games[i] else 0.0,
+            'elo': ratings[i],
+            'elo_interval': intervals[i],
+            'ms_per_move': 1000 * think_time[i] / moves[i] if moves[i] else 0,
+        })
+    return {'games': len(results), 'seconds': seconds,
+            'games_per_second': len(results) / seconds if seconds else 0.0,
+            'players': players}
+
+
+def print_summary(summary):
+    """
+    Prints a table of the results from summarize.
+    """
+    print(f'{"player":<16}{"games":>7}{"score":>8}{"elo":>8}'
+          f'{"95% interval":>18}{"ms/move":>10}')
+    for player in sorted(summary['players'], key=lambda p: -p['elo']):
+        low, high = player['elo_interval']
+        print(f'{player["name"]:<16}{player["games"]:>7}'
+              f'{player["score"]:>8.1%}{player["elo"]:>8.0f}'
+              f'{f"[{low:.0f}, {high:.0f}]":>18}'
+              f'{player["ms_per_move"]:>10.2f}')
+    print(f'{summary["games"]} games in {summary["seconds"]:.1f}s, '
+          f'{summary["games_per_second"]:.1f} games/sec')
+
+
+def main():
+    """Runs a tournament from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Play a round-robin tournament between Mancala AIs.')
+    parser.add_argument('entrants', nargs='*', type=parse_entrant,
+                        help='name=difficulty[,option=value...], for '
+                             'example hard-6=-2,max_depth=6,time_limit=None')
+    parser.add_argument('--games', type=int, default=10,
+                        help='games each pair plays')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes to play games in')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='file to write the results to')
+    args = parser.parse_args()
+
+    entrants = args.entrants or DEFAULT_ENTRANTS
+    results, seconds = play_tournament(entrants, args.games, args.workers,
+                                       args.seed)
+    summary = summarize(entrants, results, seconds)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(summary, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import random
+
+# bound types stored with each value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# rough size in bytes of one stored entry, a tuple of 6 items and its ints,
+# plus its pointer in one of the two slot lists
+ENTRY_BYTES = 150
+
+# random keys for each slot (0-13) holding each seed count (0-255), and for
+# player 2 to move. Seeded so keys are the same in every process.
+_rng = random.Random(20230621)
+ZOBRIST_KEYS = tuple(tuple(_rng.getrandbits(64) for _ in range(256))
+                     for _ in range(14))
+TURN_KEY = _rng.getrandbits(64)
+
+
+def zobrist_key(position, turn):
+    """
+    Computes the Zobrist hash of a position and the player to move.
+
+    :param position: BoardState or sequence of 14 integers in flat order.
+    :param turn: The player to move (1 or 2).
+    :return: 64 bit integer key.
+    """
+    key = TURN_KEY if turn == 2 else 0
+    for index in range(14):
+        key ^= ZOBRIST_KEYS[index][position[index]]
+    return key
+
+
+def update_key(key, position, turn, result):
+    """
+    Updates the Zobrist key of position and turn to the key of the position
+    and turn after a move, only changing the slots the move changed.
+
+    :param key: Integer key of position and turn.
+    :param position: BoardState the move was played on.
+    :param turn: The player who played the move (1 or 2).
+    :param result: MoveResult from Rules.apply_move.
+    :return: 64 bit integer key of the result's position and turn.
+    """
+    parent = position.to_bytes()
+    child = result.position.to_bytes()
+    for index in {index for index, _ in result.changes}:
+        keys = ZOBRIST_KEYS[index]
+        key ^= keys[parent[index]] ^ keys[child[index]]
+    if result.turn != turn:
+        key ^= TURN_KEY
+    return key
+
+
+class TranspositionTable:
+    """
+    A fixed size table of search results keyed by Zobrist key. Each bucket
+    has a depth-preferred slot, which keeps the deepest result from the
+    current search, and an always-replace slot for everything else. Entries
+    are tuples of (key, depth, value, bound, best move, search number).
+    Counts hits and misses to show how much searching it saves.
+    """
+
+    def __init__(self, size_mb=16):
+        """
+        :param size_mb: Approximate memory to use in megabytes.
+        """
+        self._size = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        self._deep = [None] * self._size
+        self._recent = [None] * self._size
+        self._search = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get_size(self):
+        """
+        :return: Integer of the number of buckets in the table.
+        """
+        return self._size
+
+    def new_search(self):
+        """
+        Starts a new search. Entries from earlier searches are kept for
+        lookups, but can be replaced in the depth-preferred slots.
+        """
+        self._search += 1
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters.
+        """
+        self._deep = [None] * self._size
+        self._recent = [None] * self._size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def probe(self, key):
+        """
+        Looks up the entry for key.
+
+        :param key: Integer Zobrist key.
+        :return: Tuple of (key, depth, value, bound, best move, search
+                 number), or None if key is not stored.
+        """
+        bucket = key % self._size
+        entry = self._deep[bucket]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self._recent[bucket]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, bound, move):
+        """
+        Stores a search result. Goes in the depth-preferred slot if it is at
+        least as deep as what is there, or what is there is from an earlier
+        search, otherwise in the always-replace slot.
+
+        :param key: Integer Zobrist key.
+        :param depth: Integer depth searched below the position.
+        :param value: Value found by the search.
+        :param bound: EXACT, LOWER or UPPER for what value is.
+        :param move: Integer pit number of the best move, or None.
+        """
+        self.stores += 1
+        bucket = key % self._size
+        entry = (key, depth, value, bound, move, self._search)
+        deep = self._deep[bucket]
+        if (deep is None or deep[0] == key or depth >= deep[1] or
+                deep[5] != self._search):
+            self._deep[bucket] = entry
+        else:
+            self._recent[bucket] = entry
+
+    def hit_rate(self):
+        """
+        :return: Float of the fraction of probes that found an entry.
+        """
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
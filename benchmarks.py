@@ -0,0 +1,256 @@
+import argparse
+import gc
+import importlib.util
+import json
+import platform
+import random
+import sys
+import time
+
+from Board import Board, BoardState
+from Mancala import Mancala
+from Player import HardAi
+from Rules import get_valid_moves
+
+SEED = 2024
+
+# fixed positions in flat order with the player to move, taken from random
+# games so every run times the same searches
+POSITIONS = {
+    'opening': [
+        ([4, 0, 5, 1, 6, 6, 1, 0, 1, 6, 6, 6, 6, 0], 1),
+        ([5, 1, 6, 0, 6, 6, 1, 1, 6, 5, 5, 0, 5, 1], 1),
+        ([6, 2, 7, 0, 6, 0, 2, 2, 7, 6, 0, 2, 6, 2], 1),
+        ([5, 5, 0, 5, 1, 6, 2, 6, 0, 5, 5, 0, 6, 2], 2),
+    ],
+    'middlegame': [
+        ([10, 0, 6, 0, 1, 1, 7, 1, 6, 3, 1, 0, 5, 7], 2),
+        ([10, 0, 1, 2, 0, 2, 15, 0, 1, 2, 5, 2, 1, 7], 1),
+        ([10, 0, 0, 3, 0, 2, 15, 0, 1, 2, 5, 2, 1, 7], 2),
+        ([2, 0, 7, 3, 0, 2, 5, 0, 10, 3, 2, 6, 1, 7], 2),
+    ],
+    'endgame': [
+        ([0, 4, 4, 0, 0, 1, 22, 3, 0, 0, 0, 1, 0, 13], 1),
+        ([0, 0, 5, 1, 1, 2, 22, 3, 0, 0, 0, 0, 1, 13], 1),
+        ([1, 1, 0, 0, 4, 0, 9, 2, 1, 0, 0, 2, 5, 23], 2),
+        ([1, 1, 0, 0, 4, 0, 9, 0, 2, 1, 0, 2, 5, 23], 1),
+    ],
+}
+
+CHOOSE_MOVE_DEPTHS = (2, 4, 6, 8)
+MINIMAX_DEPTH = 8
+# transposition table size for the searches, small so making a new table
+# for each timing does not dominate the shallow searches
+TABLE_SIZE_MB = 1
+GAMES = 1000
+COPY_RESTORE_CALLS = 100000
+
+
+def best_time(function, repeat):
+    """
+    :return: Float of the fewest seconds function took in repeat calls.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def random_games(count, seed=SEED):
+    """
+    Plays count games of random moves through Mancala.play_game.
+
+    :return: Integer of the moves played.
+    """
+    rng = random.Random(seed)
+    moves = 0
+    game = Mancala()
+    game.create_player('player 1')
+    game.create_player('player 2')
+    for _ in range(count):
+        game.reset()
+        while not game.get_end_state():
+            turn = game.get_turn()
+            game.play_game(turn, rng.choice(
+                game.get_board_obj().get_pits_with_seeds(turn)))
+            moves += 1
+    return moves
+
+
+def bench_play_game(repeat):
+    """Games and moves per second through Mancala.play_game."""
+    moves = random_games(GAMES)
+    seconds = best_time(lambda: random_games(GAMES), repeat)
+    return {'play_game.games_per_sec': (GAMES / seconds, True),
+            'play_game.moves_per_sec': (moves / seconds, True)}
+
+
+def bench_copy_restore(repeat):
+    """Microseconds for a copy_state and restore_state pair."""
+    game = Mancala()
+    states = []
+    for phase in POSITIONS.values():
+        for seeds, turn in phase:
+            game.get_board_obj().set_board(BoardState(seeds))
+            states.append(game.copy_state())
+
+    def copy_restore():
+        for i in range(COPY_RESTORE_CALLS):
+            game.restore_state(states[i % len(states)])
+            game.copy_state()
+
+    seconds = best_time(copy_restore, repeat)
+    return {'copy_restore.us': (1e6 * seconds / COPY_RESTORE_CALLS, False)}
+
+
+def bench_minimax(repeat):
+    """Nodes per second searched by HardAi.minimax."""
+    nodes = 0
+    seconds = 0.0
+    for phase in POSITIONS.values():
+        for seeds, turn in phase:
+            position = BoardState(seeds)
+            moves = get_valid_moves(position, turn)
+            best = None
+            for _ in range(repeat):
+                ai = HardAi(Board(), turn, TABLE_SIZE_MB,
+                            max_depth=MINIMAX_DEPTH)
+                ai.new_search()
+                start = time.perf_counter()
+                ai.rate_moves(position, moves, MINIMAX_DEPTH)
+                elapsed = time.perf_counter() - start
+                if best is None or elapsed < best:
+                    best = elapsed
+            nodes += ai.get_nodes()
+            seconds += best
+    return {'minimax.nodes_per_sec': (nodes / seconds, True)}
+
+
+def bench_choose_move(repeat):
+    """Milliseconds for HardAi.choose_move by depth and game phase."""
+    results = {}
+    for depth in CHOOSE_MOVE_DEPTHS:
+        for phase, positions in POSITIONS.items():
+            total = 0.0
+            for seeds, turn in positions:
+                board = Board()
+                board.set_board(BoardState(seeds))
+                best = None
+                for _ in range(repeat):
+                    # a new table each time, made before the timer starts
+                    ai = HardAi(board, turn, TABLE_SIZE_MB, max_depth=depth)
+                    random.seed(SEED)
+                    start = time.perf_counter()
+                    ai.choose_move()
+                    elapsed = time.perf_counter() - start
+                    if best is None or elapsed < best:
+                        best = elapsed
+                total += best
+            results[f'choose_move.{phase}.depth{depth}.ms'] = (
+                1000 * total / len(positions), False)
+    return results
+
+
+def bench_render(repeat):
+    """Frames per second drawn headless for a replay of a random game."""
+    # imported here since it starts pygame with the dummy video driver
+    import Replay
+
+    moves = Replay.random_moves(SEED)
+
+    def render():
+        return sum(1 for _ in Replay.replay_frames(moves))
+
+    frames = render()
+    seconds = best_time(render, repeat)
+    return {'render.frames_per_sec': (frames / seconds, True)}
+
+
+BENCHMARKS = (bench_play_game, bench_copy_restore, bench_minimax,
+              bench_choose_move)
+# rendering is only timed where pygame is installed
+if importlib.util.find_spec('pygame') is not None:
+    BENCHMARKS += (bench_render,)
+
+
+def run_benchmarks(repeat=3):
+    """
+    Runs every benchmark.
+
+    :param repeat: Times to time each measurement, keeping the fastest.
+    :return: Dictionary of metric names to dictionaries of the value and if
+             higher values are better.
+    """
+    results = {}
+    # like timeit, no garbage collection pauses inside the timings
+    gc.collect()
+    gc.disable()
+    try:
+        for benchmark in BENCHMARKS:
+            for name, (value, higher) in benchmark(repeat).items():
+                results[name] = {'value': value, 'higher_is_better': higher}
+    finally:
+        gc.enable()
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compares results to a baseline from an earlier run.
+
+    :param results: Dictionary from run_benchmarks.
+    :param baseline: Dictionary from run_benchmarks.
+    :param threshold: Fraction a metric can get worse by before it counts as
+                      a regression.
+    :return: List of tuples of the name, baseline value, new value and
+             fraction worse of each metric that regressed past threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]['value']
+        new = result['value']
+        if result['higher_is_better']:
+            worse = (old - new) / old if old else 0.0
+        else:
+            worse = (new - old) / old if old else 0.0
+        if worse > threshold:
+            regressions.append((name, old, new, worse))
+    return regressions
+
+
+def main():
+    """Runs the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark the Mancala engine and Hard Ai.')
+    parser.add_argument('--output', help='file to write the results to')
+    parser.add_argument('--baseline', help='results file to compare to')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fraction worse than the baseline that fails')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+    for name, result in results.items():
+        print(f'{name:<40}{result["value"]:>14.2f}')
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': platform.python_version(),
+                       'results': results}, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new, worse in regressions:
+            print(f'REGRESSION {name}: {old:.2f} -> {new:.2f} '
+                  f'({worse:.0%} worse)')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,13 @@ import pygame
 from pygame.locals import *
 import pygame.freetype
 
+from AiWorker import AiWorker
 from Gui import GraphicInterface
 from Mancala import Mancala
 
+# frames a second the main loop is held to while the screen is changing
+FPS = 60
+
 
 def check_display_time(gui):
     """Check the display time for pits and remove the changes if necessary.
@@ -14,53 +18,126 @@ def check_display_time(gui):
 
     This function iterates over the pits that have changes in their display time
     and removes the changes if the elapsed time since the change exceeds 1000 milliseconds.
-    It also updates the display to reflect the changes made.
+    It also updates the parts of the display with the pits changed.
     """
     cur_time = pygame.time.get_ticks()
-    for pit in gui.get_pits_changed():
-        if pit.time_showing_changed < cur_time - 1000:
-            gui.remove_change_display(pit)
-            pygame.display.flip()
+    expired = [pit for pit in gui.get_pits_changed()
+               if pit.time_showing_changed < cur_time - 1000]
+    for pit in expired:
+        gui.remove_change_display(pit)
+    if expired:
+        gui.refresh()
+
+
+def needs_frames(gui, game, mode):
+    """Check if the screen can change without an event coming in.
+
+    Args:
+        gui: The GraphicInterface instance.
+        game: The Mancala instance.
+        mode: The game mode (TWO, EASY, HARD, or MCTS), or None.
+
+    Returns:
+        bool: True while seeds are being sown, seed count changes are showing
+        or an Ai is choosing its move, False if the loop can wait for events.
+    """
+    if gui.get_screen_index() != 2:
+        return False
+    game_gui = gui.get_game_gui()
+    if game_gui.is_animating() or gui.game_gui_showing_changed():
+        return True
+    return (game.get_turn() == 2 and mode != 'TWO' and
+            not game.get_end_state())
+
+
+def get_events(clock, fps, busy):
+    """Get the events for the next pass of the main loop.
+
+    Args:
+        clock (pygame.time.Clock): The clock the loop is timed with.
+        fps (int): The most passes a second while busy.
+        busy (bool): If the screen is changing, from needs_frames.
+
+    Returns:
+        list: The pygame events that came in.
+
+    While busy the loop runs at fps, otherwise it sleeps until an event comes
+    instead of spinning, since nothing on the screen changes until one does.
+    """
+    if busy:
+        clock.tick(fps)
+        return pygame.event.get()
+    events = [pygame.event.wait()]
+    events.extend(pygame.event.get())
+    # doesn't count the wait as part of the next frame
+    clock.tick()
+    return events
+
 
+def main(fps=FPS):
+    """Main entry point of the Mancala game.
 
-def main():
-    """Main entry point of the Mancala game."""
+    Args:
+        fps (int, optional): The most frames a second the game is drawn at.
+            Defaults to FPS.
+    """
     gui = GraphicInterface()
+    clock = pygame.time.Clock()
     game = Mancala(gui.get_game_gui())
     mode = None
+    # chooses the Ai's moves in the background so the window stays responsive
+    ai_worker = AiWorker()
+    # the Ai player, to ponder with during the other player's turn
+    ai_player = None
 
     while True:
         # check if on game screen
         if gui.get_screen_index() == 2:
+            # shows the seeds sown since the last frame
+            gui.get_game_gui().animate()
+            ended = game.get_end_state()
+
+            # the Hard Ai searches its replies while the player decides
+            if mode == 'HARD' and game.get_turn() == 1 and not ended:
+                ai_worker.ponder(ai_player, game.get_board_obj().get_state())
 
             if gui.game_gui_showing_changed():
                 # removes update if passed time limit
                 check_display_time(gui.get_game_gui())
 
             # check if it is an Ai's turn (set up for Ai always as player 2)
-            elif game.get_turn() == 2 and mode != 'TWO':
-                arg = None
-                if mode == 'HARD':
-                    arg = Mancala
-                move = game.get_player_obj().choose_move(arg) if arg else \
-                    game.get_player_obj().choose_move()
-                game.play_game(
-                    2, move)
-                # check if game ended
-                ended = game.get_end_state()
-
-                # updates gui to new turn after move completed
-                if not ended:
-                    gui.get_game_gui().display_turn(
-                        game.get_player_obj().get_name(), game.get_turn())
+            elif (game.get_turn() == 2 and mode != 'TWO' and not ended and
+                  not gui.get_game_gui().is_animating()):
+                ai = game.get_player_obj()
+                if not ai_worker.is_thinking():
+                    if mode == 'HARD':
+                        ai_worker.start(ai, Mancala)
+                    else:
+                        ai_worker.start(ai)
+                move = ai_worker.poll()
+                if move is None:
+                    gui.get_game_gui().display_thinking(ai.get_name())
                 else:
-                    # go to end game screen
-                    winner_str = game.return_winner()
-                    store1, store2 = game.get_stores()
-                    gui.next_screen(winner_str, store1, store2)
+                    gui.get_game_gui().clear_thinking()
+                    game.play_game(
+                        2, move)
+                    # check if game ended
+                    ended = game.get_end_state()
 
-        for event in pygame.event.get():
+                    # updates gui to new turn after move completed
+                    if not ended:
+                        gui.get_game_gui().display_turn(
+                            game.get_player_obj().get_name(), game.get_turn())
+                    else:
+                        # go to end game screen after the last seeds are sown
+                        winner_str = game.return_winner()
+                        store1, store2 = game.get_stores()
+                        gui.get_game_gui().after_animation(
+                            gui.next_screen, winner_str, store1, store2)
+
+        for event in get_events(clock, fps, needs_frames(gui, game, mode)):
             if event.type == QUIT:
+                ai_worker.cancel()
                 return
 
             if (gui.get_screen_index() == 0 or gui.get_screen_index() == 1 or
@@ -70,6 +147,12 @@ def main():
 
             if event.type == MOUSEBUTTONDOWN:
 
+                # a click during the sowing animation shows the rest at once
+                if (gui.get_screen_index() == 2 and
+                        gui.get_game_gui().is_animating()):
+                    gui.get_game_gui().skip_animation()
+                    continue
+
                 # Main Game Click
                 if (gui.get_screen_index() == 2 and
                         (mode == 'TWO' or
@@ -82,7 +165,7 @@ def main():
                     # remove border
                     for p in game_gui.pits[game.get_turn() - 1]:
                         p.can_select = False
-                        p.update_display()
+                        game_gui.update(p)
                     game.play_game(game.get_turn(), pit.num)
 
                     # check if game ended
@@ -93,10 +176,13 @@ def main():
                             game.get_player_obj().get_name(), game.get_turn())
 
                     else:
-                        # go to end game screen
+                        # stops pondering a position that can't happen now
+                        ai_worker.cancel()
+                        # go to end game screen after the last seeds are sown
                         winner_str = game.return_winner()
                         store1, store2 = game.get_stores()
-                        gui.next_screen(winner_str, store1, store2)
+                        game_gui.after_animation(
+                            gui.next_screen, winner_str, store1, store2)
                         continue
 
                 elif gui.get_screen_index() != 2:
@@ -124,13 +210,14 @@ def main():
                         elif len(click) == 2:
                             player_one_name, player_two_name = click
                             game.create_player(player_one_name)
-                            game.create_player(player_two_name)
+                            ai_player = game.create_player(player_two_name)
                             gui.next_screen(player_one_name, player_two_name)
 
                     # End Screen Click
                     elif click and gui.get_screen_index() == 3:
                         # Restart Game
                         if click == 2:
+                            ai_worker.cancel()
                             game.reset()
                             name1 = name2 = None
                             names = game.get_player_names()
@@ -146,12 +233,14 @@ def main():
 
                         # Go To Main Menu
                         elif click == 1:
+                            ai_worker.cancel()
                             game.reset(True)
                             gui.get_game_gui().reset()
                             gui.show_mode_screen()
 
                         # Exit Game
                         elif click == -1:
+                            ai_worker.cancel()
                             return
 
             if gui.get_screen_index() == 1 and event.type == pygame.KEYDOWN:
@@ -1,8 +1,51 @@
 from Mancala import Mancala, Board, Player
+from Board import BoardState, MAX_TABLE_SEEDS, OPPOSITE_SLOT
+from Rules import apply_move, get_valid_moves
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
-from unittest.mock import patch, MagicMock
-
-from Player import HardAi
+from unittest.mock import patch, MagicMock, Mock
+
+try:
+    import numpy as np
+    from BatchSimulator import BatchMancala, NOT_ENDED, TIE
+except ImportError:
+    np = None
+
+try:
+    # no window is opened for the gui tests
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    import Gui
+    import main
+    import Replay
+except ImportError:
+    pygame = Replay = None
+
+from EndgameDatabase import (EndgameDatabase, build_database,
+                             count_positions, rank_pits)
+from Evaluation import (CAPTURE_THREATS, FEATURE_SETS, MOBILITY,
+                        SEEDS_ON_SIDE, STORE_DIFFERENCE, Evaluator)
+import benchmarks
+from AiWorker import AiWorker
+from OpeningBook import OpeningBook, build_book
+from Player import HardAi, MctsAi, SearchCancelled
+from SearchStats import SearchStats, logging_hook
+from Tournament import (Entrant, GameResult, entrant_options, fit_elo,
+                        parse_entrant, play_tournament, schedule, summarize)
+from TranspositionTable import (EXACT, LOWER, UPPER, TranspositionTable,
+                                update_key, zobrist_key)
+
+
+def best_moves(moves, ratings):
+    """Returns the moves with the highest rating"""
+    return [move for move, rating in zip(moves, ratings)
+            if rating == max(ratings)]
 
 
 class MancalaTest(unittest.TestCase):
@@ -286,6 +329,50 @@ class MancalaTest(unittest.TestCase):
         self.assertListEqual(should_be, game.play_game(1, 3))
 
 
+    def test_make_move_unmake_move(self):
+        """make_move and unmake_move return to the same state"""
+        game = Mancala()
+        game.create_player('Lisa')
+        game.create_player('Fink')
+        game._board._board = [[0, 0, 0, 1, 0, 13, 20], [1, 0, 5, 0, 2, 0, 6]]
+        saved = game.copy_state()
+        undo = game.make_move(6)
+        self.assertEqual(game.get_turn(), 2)
+        # records the pickup, the 13 slots sown and the 3 capture changes
+        self.assertEqual(len(undo[-1]), 17)
+        game.unmake_move(undo)
+        self.assertEqual(game.copy_state(), saved)
+
+        # capture and end of game are undone
+        undo = game.make_move(4)
+        self.assertEqual(game.get_board()[0], [0, 0, 0, 0, 1, 13, 20])
+        game.unmake_move(undo)
+        game._board._board = [[0, 0, 0, 0, 0, 1, 0], [1, 0, 5, 0, 2, 0, 6]]
+        saved = game.copy_state()
+        undo = game.make_move(6)
+        self.assertTrue(game.get_end_state())
+        self.assertEqual(game.get_winner(), 2)
+        game.unmake_move(undo)
+        self.assertEqual(game.copy_state(), saved)
+
+    def test_make_move_matches_play_game(self):
+        """a game of make_move calls can be unmade back to the start"""
+        game = Mancala()
+        game.create_player('Lisa')
+        game.create_player('Fink')
+        start = game.copy_state()
+        undos = []
+        i = 0
+        while not game.get_end_state():
+            moves = game.get_board_obj().get_pits_with_seeds(game.get_turn())
+            undos.append(game.make_move(moves[i % len(moves)]))
+            i += 1
+        self.assertEqual(sum(game.get_stores()), 48)
+        for undo in reversed(undos):
+            game.unmake_move(undo)
+        self.assertEqual(game.copy_state(), start)
+
+
 class BoardTest(unittest.TestCase):
     def test1(self):
         """test flat"""
@@ -353,6 +440,42 @@ class BoardTest(unittest.TestCase):
         next_pit = (1, 1)
         self.assertEqual(res, next_pit)
 
+    def test_sow_seeds_matches_one_at_a_time(self):
+        """sow_seeds gives the same board as dropping one seed at a time"""
+        for turn in (1, 2):
+            for start_pit in range(1, 7):
+                # past MAX_TABLE_SEEDS uses get_sowing instead of the table
+                for seeds in range(0, MAX_TABLE_SEEDS + 14):
+                    expected = Board()
+                    side, pit = turn, start_pit
+                    for _ in range(seeds):
+                        side, pit = expected.get_next_pit(turn, side, pit)
+                        expected.add_seeds(side, pit, 1)
+                    b = Board()
+                    res = b.sow_seeds(turn, start_pit, seeds)
+                    self.assertEqual(res, (side, pit))
+                    self.assertListEqual(b.get_board(), expected.get_board())
+
+    def test_opposite_slot_table(self):
+        b = Board()
+        for side in (1, 2):
+            for pit in range(1, 7):
+                # pit 1 faces the opponent's pit 6, and so on
+                opp_side, opp_pit = 3 - side, 7 - pit
+                self.assertEqual(b.get_opposite_pit(side, pit),
+                                 (opp_side, opp_pit))
+                self.assertEqual(OPPOSITE_SLOT[(side - 1) * 7 + pit - 1],
+                                 (opp_side - 1) * 7 + opp_pit - 1)
+        self.assertIsNone(OPPOSITE_SLOT[6])
+        self.assertIsNone(OPPOSITE_SLOT[13])
+
+    def test_sow_seeds_skips_opponent_store(self):
+        b = Board()
+        b._board = [[0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0]]
+        self.assertEqual(b.sow_seeds(2, 1, 27), (2, 2))
+        self.assertListEqual(b.get_board(),
+                             [[2, 2, 2, 2, 2, 2, 0], [2, 3, 2, 2, 2, 2, 2]])
+
     def test7(self):
         """get_seeds_in_store"""
         b = Board()
@@ -413,6 +536,140 @@ class BoardTest(unittest.TestCase):
         self.assertListEqual([1,2,3,4,5,6], res)
 
 
+class BoardStateTests(unittest.TestCase):
+    def test_matches_board(self):
+        b = Board()
+        b._board = [[1, 2, 3, 4, 5, 6, 7], [8, 9, 10, 0, 0, 0, 11]]
+        state = b.get_state()
+        self.assertListEqual(state.flat(), b.flat())
+        self.assertListEqual(state.get_board(), b.get_board())
+        self.assertEqual(state.get_seeds_in_pit(2, 3), 10)
+        self.assertEqual(state.get_seeds_in_store(1), 7)
+        self.assertEqual(state.get_seeds_in_store(2), 11)
+        self.assertListEqual(state.get_pits_with_seeds(2), [1, 2, 3])
+        self.assertListEqual(state.get_players_pits(2), [8, 9, 10, 0, 0, 0])
+
+    def test_hashable_and_equal(self):
+        state = Board().get_state()
+        same = BoardState([4, 4, 4, 4, 4, 4, 0, 4, 4, 4, 4, 4, 4, 0])
+        self.assertEqual(state, same)
+        self.assertEqual({state: 1}[same], 1)
+        self.assertNotEqual(state, BoardState([0] * 14))
+
+    def test_immutable(self):
+        state = Board().get_state()
+        with self.assertRaises(TypeError):
+            state[0] = 1
+        with self.assertRaises(AttributeError):
+            state._seeds = b''
+
+    def test_set_board_copies_state(self):
+        b = Board()
+        state = BoardState.from_board([[0, 0, 0, 0, 0, 0, 20],
+                                       [1, 0, 0, 0, 0, 0, 27]])
+        b.set_board(state)
+        b.add_seeds(2, 1, 1)
+        self.assertEqual(b.get_seeds_in_pit(2, 1), 2)
+        self.assertEqual(state.get_seeds_in_pit(2, 1), 1)
+
+    def test_copy_and_restore_state(self):
+        game = Mancala()
+        game.create_player('Lisa')
+        game.create_player('Fink')
+        saved = game.copy_state()
+        self.assertIsInstance(saved[1], BoardState)
+        game.play_game(1, 3)
+        game.restore_state(saved)
+        self.assertListEqual(game.get_board(), Board().get_board())
+        self.assertEqual(game.get_turn(), 1)
+
+    def test_hard_ai_on_state(self):
+        state = BoardState.from_board([[0, 0, 0, 0, 0, 0, 0],
+                                       [0, 0, 0, 1, 0, 0, 0]])
+        ai = HardAi(state, 2)
+        self.assertEqual(4, ai.choose_move(Mancala))
+        self.assertEqual(ai.evaluation(state), 0)
+
+
+class RulesTests(unittest.TestCase):
+    def test_apply_move_does_not_change_position(self):
+        position = Board().get_state()
+        res = apply_move(position, 1, 3)
+        self.assertEqual(position, Board().get_state())
+        self.assertListEqual(res.position.flat(),
+                             [4, 4, 0, 5, 5, 5, 1, 4, 4, 4, 4, 4, 4, 0])
+        self.assertEqual(res.turn, 1)
+        self.assertTrue(res.extra_turn)
+        self.assertFalse(res.ended)
+
+    def test_apply_move_capture(self):
+        position = BoardState.from_board([[2, 0, 0, 1, 0, 0, 0],
+                                          [4, 7, 4, 4, 4, 4, 0]])
+        res = apply_move(position, 1, 4)
+        self.assertEqual(res.captured, 7)
+        self.assertEqual(res.turn, 2)
+        self.assertListEqual(res.position.get_board(),
+                             [[2, 0, 0, 0, 0, 0, 8], [4, 0, 4, 4, 4, 4, 0]])
+        self.assertListEqual(list(res.changes),
+                             [(3, -1), (4, 1), (8, -7), (4, -1), (6, 8)])
+
+    def test_apply_move_end_game(self):
+        position = BoardState.from_board([[0, 0, 0, 0, 0, 1, 0],
+                                          [1, 2, 0, 0, 0, 0, 0]])
+        res = apply_move(position, 1, 6)
+        self.assertTrue(res.ended)
+        self.assertFalse(res.extra_turn)
+        self.assertListEqual(res.position.get_board(),
+                             [[0, 0, 0, 0, 0, 0, 1], [0, 0, 0, 0, 0, 0, 3]])
+
+    def test_apply_move_ends_when_opponent_has_no_moves(self):
+        # capturing the opponent's last seeds ends the game
+        position = BoardState.from_board([[0, 0, 0, 1, 0, 3, 0],
+                                          [0, 2, 0, 0, 0, 0, 0]])
+        res = apply_move(position, 1, 4)
+        self.assertTrue(res.ended)
+        self.assertEqual(get_valid_moves(res.position, 2), [])
+        self.assertListEqual(res.position.get_board(),
+                             [[0, 0, 0, 0, 0, 0, 6], [0, 0, 0, 0, 0, 0, 0]])
+
+    def test_apply_move_matches_player_seeds(self):
+        """apply_move matches the Player and Board methods for a turn"""
+        random.seed(3)
+        for _ in range(200):
+            game = Mancala()
+            game.create_player('Lisa')
+            game.create_player('Fink')
+            board = game.get_board_obj()
+            while not game.get_end_state():
+                turn = game.get_turn()
+                if not board.has_seeds_on_side(turn):
+                    break
+                move = random.choice(board.get_pits_with_seeds(turn))
+                res = apply_move(board.get_state(), turn, move)
+                game.get_player_obj().pickup_seeds(board.clear_pit(turn, move))
+                game.drop_seeds_in_pits(move)
+                if game.is_end():
+                    game.end_game()
+                elif not game.special1:
+                    game.toggle_turn()
+                else:
+                    game.special1 = False
+                if not res.ended or game.get_end_state():
+                    self.assertEqual(res.position, board.get_state())
+                    self.assertEqual(res.ended, game.get_end_state())
+                    self.assertEqual(res.turn, game.get_turn())
+
+    def test_gui_gets_each_change(self):
+        gui = MagicMock()
+        game = Mancala(gui)
+        game.create_player('Lisa')
+        game.create_player('Fink')
+        game.play_game(1, 3)
+        self.assertListEqual(
+            [c.args for c in gui.update_pit.call_args_list],
+            [(1, 3, -4), (1, 4, 1), (1, 5, 1), (1, 6, 1), (1, 7, 1)])
+
+
 class PlayerTests(unittest.TestCase):
     def test1(self):
         """number_of_seeds_in_hand"""
@@ -569,6 +826,1203 @@ class HardAiTests(unittest.TestCase):
         ai.minimax.side_effect = [100, 0, 0, 0, 0, 45]
         self.assertEqual(1, ai.choose_move(Mancala))
 
+    def test_choose_move_uses_table(self):
+        board = Board()
+        board.set_board([[5, 0, 6, 6, 6, 6, 1], [4, 4, 4, 4, 4, 4, 0]])
+        ai = HardAi(board, 2, 1)
+        node = apply_move(board.get_state(), 1, 1)
+        first = ai.minimax(node, 4, float('-inf'), float('inf'))
+        # moves searched again after a null window search hit the table
+        hits = ai.get_table().hits
+        self.assertEqual(ai.minimax(node, 4, float('-inf'), float('inf')),
+                         first)
+        self.assertEqual(ai.get_table().hits, hits + 1)
+        no_table = HardAi(board, 2, 0)
+        self.assertIsNone(no_table.get_table())
+        self.assertEqual(
+            no_table.minimax(node, 4, float('-inf'), float('inf')), first)
+
+    def test_table_hit_is_depth_limited(self):
+        ai = HardAi(Board(), 2, 1)
+        node = apply_move(Board().get_state(), 1, 1)
+        first = ai.minimax(node, 2, float('-inf'), float('inf'))
+        # the second search returns the root's entry without going deeper
+        ai._depth_limited = False
+        self.assertEqual(ai.minimax(node, 2, float('-inf'), float('inf')),
+                         first)
+        self.assertTrue(ai._depth_limited)
+
+    def test_iterative_deepening_matches_fixed_depth(self):
+        board = Board()
+        # after player 1 opens with pit 2
+        board.set_board([[4, 0, 5, 5, 5, 5, 0], [4, 4, 4, 4, 4, 4, 0]])
+        moves = [1, 2, 3, 4, 5, 6]
+        fixed = HardAi(board, 2, 0, max_depth=3)
+        deepening = HardAi(board, 2, 0, max_depth=3, time_limit=60)
+        self.assertEqual(
+            best_moves(moves,
+                       deepening.iterative_deepening(board.get_state(), moves)),
+            best_moves(moves, fixed.rate_moves(board.get_state(), moves, 3)))
+        self.assertEqual(deepening.get_completed_depth(), 3)
+
+    def test_rate_moves_best_moves_match_full_search(self):
+        board = Board()
+        ai = HardAi(board, 2, 0)
+        for position in ([[4, 0, 5, 5, 5, 5, 0], [4, 4, 4, 4, 4, 4, 0]],
+                         [[0, 2, 0, 1, 3, 0, 20], [1, 0, 2, 0, 0, 4, 15]]):
+            state = BoardState.from_board(position)
+            moves = get_valid_moves(state, 2)
+            full = [ai.rate_move(state, move, 4) for move in moves]
+            self.assertEqual(best_moves(moves, ai.rate_moves(state, moves, 4)),
+                             best_moves(moves, full))
+
+    def test_parallel_rate_moves_matches_serial(self):
+        board = Board()
+        board.set_board([[5, 0, 6, 6, 6, 6, 1], [4, 4, 4, 4, 4, 4, 0]])
+        state = board.get_state()
+        moves = [1, 2, 3, 4, 5, 6]
+        serial = HardAi(board, 2, 0)
+        parallel = HardAi(board, 2, 0, workers=2)
+        try:
+            for depth in (2, 5):
+                self.assertEqual(
+                    best_moves(moves, parallel.rate_moves(state, moves, depth)),
+                    best_moves(moves, serial.rate_moves(state, moves, depth)))
+            # pool is reused by the next move
+            pool = parallel._pool
+            parallel.rate_moves(state, moves, 1)
+            self.assertIs(parallel._pool, pool)
+        finally:
+            parallel.close()
+
+    def test_stop_reaches_pool_workers(self):
+        state = Board().get_state()
+        moves = [1, 2, 3, 4, 5, 6]
+        ai = HardAi(Board(), 1, 1, workers=2)
+        try:
+            # starts the workers first, so the stop comes mid search
+            ai.rate_moves(state, moves, 1)
+            errors = []
+
+            def search():
+                try:
+                    ai.rate_moves(state, moves, 40)
+                except SearchCancelled as error:
+                    errors.append(error)
+
+            thread = threading.Thread(target=search)
+            thread.start()
+            time.sleep(0.3)
+            ai.request_stop()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual(len(errors), 1)
+            # the workers are free for the next search
+            ai.clear_stop()
+            thread = threading.Thread(target=ai.rate_moves,
+                                      args=(state, moves, 2))
+            thread.start()
+            thread.join(1)
+            self.assertFalse(thread.is_alive())
+        finally:
+            ai.close()
+
+    def test_iterative_deepening_time_limit(self):
+        board = Board()
+        ai = HardAi(board, 2, max_depth=None, time_limit=0.2)
+        start = time.perf_counter()
+        move = ai.choose_move(Mancala)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertIn(move, [1, 2, 3, 4, 5, 6])
+        self.assertGreaterEqual(ai.get_completed_depth(), 1)
+        self.assertLess(ai.get_completed_depth(), 20)
 
+    def test_iterative_deepening_stops_at_end_of_game(self):
+        board = Board()
+        board.set_board([[0, 0, 0, 0, 0, 1, 22], [0, 0, 0, 0, 1, 1, 23]])
+        ai = HardAi(board, 2, max_depth=None, time_limit=60)
+        self.assertEqual(ai.choose_move(Mancala), 6)
+        self.assertLess(ai.get_completed_depth(), 10)
 
+    def test_move_ordering_searches_fewer_nodes(self):
+        board = Board()
+        board.set_board([[3, 0, 7, 1, 2, 5, 8], [0, 6, 1, 3, 2, 2, 8]])
+        state = board.get_state()
+        moves = get_valid_moves(state, 2)
+        results = []
+        for ordering in (False, True):
+            ai = HardAi(board, 2, 0, move_ordering=ordering)
+            ai.new_search()
+            ratings = ai.rate_moves(state, moves, 6)
+            results.append((best_moves(moves, ratings), ai.get_nodes()))
+        self.assertEqual(results[0][0], results[1][0])
+        self.assertLess(results[1][1], results[0][1] // 2)
+
+    def test_order_moves(self):
+        board = Board()
+        ai = HardAi(board, 1)
+        # pit 3 lands in the store, pit 1 captures, pit 6 is a killer move
+        state = BoardState.from_board([[1, 0, 4, 0, 0, 3, 0],
+                                       [4, 4, 4, 4, 4, 4, 0]])
+        ai.record_cutoff(1, 6, 3)
+        self.assertListEqual(ai.order_moves(state, 1, [1, 3, 6], 3),
+                             [3, 1, 6])
+        self.assertListEqual(ai.order_moves(state, 1, [1, 3, 6], 3, 6),
+                             [6, 3, 1])
+        # history orders the other moves
+        ai.record_cutoff(1, 1, 5)
+        self.assertListEqual(ai.order_moves(state, 1, [1, 6], 2), [1, 6])
+
+    def full_minimax(self, ai, node, depth):
+        """Minimax without pruning, rating node for ai like ai.minimax"""
+        position = node.position
+        moves = get_valid_moves(position, node.turn)
+        if (node.ended or position.store_has_seeds_to_win() or depth == 0 or
+                not moves):
+            return ai.evaluation(position)
+        ratings = [self.full_minimax(ai, apply_move(position, node.turn, move),
+                                     depth - 1)
+                   for move in moves]
+        if node.turn == 2:
+            return max(ratings)
+        return min(ratings)
+
+    def test_negamax_matches_full_minimax(self):
+        random.seed(7)
+        for _ in range(10):
+            node = apply_move(Board().get_state(), 1, random.randint(1, 6))
+            # random positions, with extra turns for both players
+            for _ in range(random.randint(0, 12)):
+                if node.ended:
+                    break
+                node = apply_move(node.position, node.turn, random.choice(
+                    get_valid_moves(node.position, node.turn)))
+            for table_size in (0, 1):
+                ai = HardAi(Board(), 2, table_size)
+                self.assertEqual(
+                    ai.minimax(node, 4, float('-inf'), float('inf')),
+                    self.full_minimax(ai, node, 4))
+                # with a window, ratings outside it are bounds
+                rating = self.full_minimax(ai, node, 4)
+                low = ai.minimax(node, 4, rating - 1, rating + 1)
+                self.assertEqual(low, rating)
+                self.assertGreaterEqual(
+                    ai.minimax(node, 4, rating - 5, rating - 2), rating - 2)
+                self.assertLessEqual(
+                    ai.minimax(node, 4, rating + 2, rating + 5), rating + 2)
+
+    def test_aspiration_window_keeps_best_moves(self):
+        board = Board()
+        board.set_board([[3, 0, 7, 1, 2, 5, 8], [0, 6, 1, 3, 2, 2, 8]])
+        state = board.get_state()
+        moves = get_valid_moves(state, 2)
+        ai = HardAi(board, 2, 0)
+        ai.new_search()
+        ratings = ai.rate_moves(state, moves, 5)
+        best = best_moves(moves, ratings)
+        order = sorted(range(len(moves)), key=lambda i: -ratings[i])
+        # a guess too low, too high and right
+        for guess in (max(ratings) - 10, max(ratings) + 10, max(ratings)):
+            ai.new_search()
+            self.assertEqual(best_moves(moves, ai.rate_moves(
+                state, moves, 5, order, guess)), best)
+
+    def test_ponder_positions(self):
+        ai = HardAi(Board(), 2)
+        start = Board().get_state()
+        positions = ai.ponder_positions(start)
+        # every way player 1 can play the first turn, pit 3 lands in the
+        # store and is followed by each of the other moves
+        expected = {}
+        for move in range(1, 7):
+            res = apply_move(start, 1, move)
+            if res.turn == 2:
+                expected[res.position] = res
+            else:
+                for extra in get_valid_moves(res.position, 1):
+                    child = apply_move(res.position, 1, extra)
+                    expected[child.position] = child
+        self.assertEqual(len(positions), len(expected))
+        self.assertEqual(set(positions), set(expected))
+        # player 1's best replies first, rated from player 2's view
+        searcher = HardAi(Board(), 2, 0)
+        ratings = [searcher.minimax(expected[position], 2, float('-inf'),
+                                    float('inf'))
+                   for position in positions]
+        self.assertEqual(ratings, sorted(ratings))
+
+    def test_choose_move_uses_ponder(self):
+        game = Mancala()
+        game.create_player('p1')
+        ai = game.create_player(-2, max_depth=6, time_limit=None,
+                                endgame_path=None, book_path=None)
+        ai.ponder(game.get_board_obj().get_state())
+        game.play_game(1, 1)
+        move, stats = ai.choose_move(return_stats=True)
+        self.assertTrue(stats.pondered)
+        self.assertEqual(ai.get_nodes(), 0)
+        self.assertEqual(ai.get_completed_depth(), 6)
+        # the same move as searching without pondering
+        searcher = HardAi(game.get_board_obj(), 2, 0, max_depth=6)
+        searcher.new_search()
+        state = game.get_board_obj().get_state()
+        moves = get_valid_moves(state, 2)
+        self.assertIn(move, best_moves(
+            moves, searcher.rate_moves(state, moves, 6)))
+        # the ratings are only used once
+        move, stats = ai.choose_move(return_stats=True)
+        self.assertFalse(stats.pondered)
+        self.assertGreater(ai.get_nodes(), 0)
+
+    def test_ponder_keeps_reachable_ratings(self):
+        ai = HardAi(Board(), 2, max_depth=2, time_limit=None,
+                    endgame_path=None, book_path=None)
+        start = Board().get_state()
+        ai.ponder(start)
+        pondered = dict(ai._pondered)
+        # pit 3 gives player 1 another turn, whose positions were pondered
+        extra = apply_move(start, 1, 3).position
+        with patch.object(ai, 'search_ratings',
+                          wraps=ai.search_ratings) as search_ratings:
+            ai.ponder(extra)
+        search_ratings.assert_not_called()
+        self.assertEqual(set(ai._pondered), set(ai.ponder_positions(extra)))
+        for child, entry in ai._pondered.items():
+            self.assertIs(entry, pondered[child])
+
+    def test_ponder_stops(self):
+        ai = HardAi(Board(), 2, max_depth=None, time_limit=60)
+        ai.request_stop()
+        start = time.monotonic()
+        ai.ponder(Board().get_state())
+        self.assertLess(time.monotonic() - start, 1)
+
+
+class TranspositionTableTests(unittest.TestCase):
+    def test_update_key_matches_zobrist_key(self):
+        random.seed(4)
+        position, turn = Board().get_state(), 1
+        key = zobrist_key(position, turn)
+        for _ in range(30):
+            moves = get_valid_moves(position, turn)
+            if not moves:
+                break
+            res = apply_move(position, turn, random.choice(moves))
+            key = update_key(key, position, turn, res)
+            position, turn = res.position, res.turn
+            self.assertEqual(key, zobrist_key(position, turn))
+
+    def test_turn_changes_key(self):
+        position = Board().get_state()
+        self.assertNotEqual(zobrist_key(position, 1),
+                            zobrist_key(position, 2))
+
+    def test_probe_and_store(self):
+        table = TranspositionTable(1)
+        self.assertIsNone(table.probe(12345))
+        table.store(12345, 3, 7, EXACT, 2)
+        self.assertEqual(table.probe(12345)[:5], (12345, 3, 7, EXACT, 2))
+        self.assertEqual((table.hits, table.misses), (1, 1))
+        self.assertEqual(table.hit_rate(), 0.5)
+        table.clear()
+        self.assertIsNone(table.probe(12345))
+
+    def test_depth_preferred_replacement(self):
+        table = TranspositionTable(1)
+        size = table.get_size()
+        table.store(1, 6, 10, LOWER, 1)
+        # shallower entry in the same bucket goes in the always-replace slot
+        table.store(1 + size, 2, 5, UPPER, 3)
+        self.assertEqual(table.probe(1)[1], 6)
+        self.assertEqual(table.probe(1 + size)[1], 2)
+        table.store(1 + 2 * size, 1, 0, EXACT, 4)
+        self.assertIsNone(table.probe(1 + size))
+        # deep slot can be replaced once a new search starts
+        table.new_search()
+        table.store(1 + 3 * size, 1, 0, EXACT, 5)
+        self.assertIsNone(table.probe(1))
+
+
+class EndgameDatabaseTests(unittest.TestCase):
+    """Tests for the endgame database"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'endgame.db')
+        build_database(cls.path, 5)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def solve(self, position, turn):
+        """Best margin for turn by searching every move to the end"""
+        moves = get_valid_moves(position, turn)
+        if not moves:
+            return -sum(position[(2 - turn) * 7:(2 - turn) * 7 + 6])
+        best = None
+        for move in moves:
+            res = apply_move(position, turn, move)
+            value = ((res.position[turn * 7 - 1] - position[turn * 7 - 1]) -
+                     (res.position[20 - turn * 7] - position[20 - turn * 7]))
+            if not res.ended:
+                if res.turn == turn:
+                    value += self.solve(res.position, turn)
+                else:
+                    value -= self.solve(res.position, res.turn)
+            if best is None or value > best:
+                best = value
+        return best
+
+    def test_rank_pits_numbers_every_position(self):
+        ranks = set()
+        for _ in range(2000):
+            pits = [0] * 12
+            for _ in range(random.randint(0, 5)):
+                pits[random.randrange(12)] += 1
+            ranks.add(rank_pits(pits))
+        self.assertTrue(all(0 <= rank < count_positions(5) for rank in ranks))
+        self.assertEqual(rank_pits([0] * 12), 0)
+        self.assertEqual(rank_pits([0] * 11 + [5]), count_positions(4))
+
+    def test_probe_matches_full_search(self):
+        database = EndgameDatabase(self.path)
+        for _ in range(300):
+            seeds = [0] * 14
+            for _ in range(random.randint(1, 5)):
+                seeds[random.choice([0, 1, 2, 3, 4, 5,
+                                     7, 8, 9, 10, 11, 12])] += 1
+            seeds[6] = random.randint(0, 20)
+            seeds[13] = random.randint(0, 20)
+            position = BoardState(seeds)
+            turn = random.randint(1, 2)
+            self.assertEqual(database.probe(position, turn),
+                             self.solve(position, turn))
+        database.close()
+
+    def test_probe_out_of_range(self):
+        database = EndgameDatabase(self.path)
+        self.assertEqual(database.get_max_seeds(), 5)
+        self.assertIsNone(database.probe(Board().get_state(), 1))
+        database.close()
+
+    def test_missing_file(self):
+        database = EndgameDatabase(os.path.join(self.directory.name, 'none'))
+        self.assertEqual(database.get_max_seeds(), -1)
+        self.assertIsNone(database.probe(BoardState([0] * 14), 1))
+
+    def test_hard_ai_uses_database(self):
+        # player 2 can capture 3 seeds with pit 1 to win 26 to 22
+        board = Board()
+        board.set_board(BoardState([0, 0, 0, 0, 3, 0, 22,
+                                    1, 0, 0, 1, 0, 0, 21]))
+        position = board.get_state()
+        ai = HardAi(board, 2, max_depth=1, endgame_path=self.path)
+        self.assertEqual(ai.choose_move(), 1)
+        # ratings at depth 1 are the same as searching to the end
+        full = HardAi(board, 2, max_depth=30)
+        for move in (1, 4):
+            self.assertEqual(ai.rate_move(position, move, 1),
+                             full.rate_move(position, move, 30))
+        self.assertEqual(ai.endgame_evaluation(position, 2, 5), 100)
+        self.assertEqual(ai.endgame_evaluation(position, 2, 1), 0)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class BatchSimulatorTests(unittest.TestCase):
+    """Tests for BatchMancala"""
+
+    def test_start(self):
+        batch = BatchMancala(3)
+        self.assertEqual(batch.boards.tolist(),
+                         [Board().get_state().flat()] * 3)
+        self.assertEqual(batch.valid_moves().sum(), 18)
+        self.assertEqual(batch.winners().tolist(), [NOT_ENDED] * 3)
+
+    def test_step_matches_apply_move(self):
+        rng = random.Random(7)
+        states, turns, moves = [], [], []
+        for _ in range(500):
+            seeds = [rng.randint(0, 15) if i not in (6, 13) else
+                     rng.randint(0, 20) for i in range(14)]
+            turn = rng.randint(1, 2)
+            valid = get_valid_moves(BoardState(seeds), turn)
+            if valid:
+                states.append(BoardState(seeds))
+                turns.append(turn)
+                moves.append(rng.choice(valid))
+        batch = BatchMancala.from_states(states, turns)
+        played, extra, captured, ended = batch.step(np.array(moves))
+        self.assertTrue(played.all())
+        for i, state in enumerate(states):
+            res = apply_move(state, turns[i], moves[i])
+            self.assertEqual(batch.boards[i].tolist(), res.position.flat())
+            self.assertEqual(batch.turns[i], res.turn)
+            self.assertEqual(extra[i], res.extra_turn)
+            self.assertEqual(captured[i], res.captured)
+            self.assertEqual(ended[i], res.ended)
+
+    def test_random_games_match_mancala(self):
+        batch = BatchMancala(50, rng=np.random.default_rng(11))
+        games = []
+        for _ in range(50):
+            game = Mancala()
+            game.create_player('p1')
+            game.create_player('p2')
+            games.append(game)
+        while not batch.ended.all():
+            moves = batch.random_moves()
+            batch.step(moves)
+            for i, game in enumerate(games):
+                if moves[i]:
+                    self.assertTrue(moves[i] in game.get_board_obj()
+                                    .get_pits_with_seeds(game.get_turn()))
+                    game.play_game(game.get_turn(), int(moves[i]))
+                self.assertEqual(batch.boards[i].tolist(),
+                                 game.copy_state()[1].flat())
+                self.assertEqual(batch.ended[i], game.get_end_state())
+        for i, game in enumerate(games):
+            winner = game.get_winner()
+            self.assertEqual(batch.winners()[i],
+                             TIE if winner == 'tie' else winner)
+
+    def test_ended_games_are_skipped(self):
+        batch = BatchMancala(2)
+        batch.ended[0] = True
+        played, _, _, _ = batch.step(np.array([3, 3]))
+        self.assertEqual(played.tolist(), [False, True])
+        self.assertEqual(batch.boards[0].tolist(),
+                         Board().get_state().flat())
+        self.assertEqual(batch.random_moves()[0], 0)
+
+    def test_play_random(self):
+        batch = BatchMancala(200, rng=np.random.default_rng(5))
+        winners = batch.play_random()
+        self.assertTrue(batch.ended.all())
+        self.assertTrue(np.isin(winners, (1, 2, TIE)).all())
+        self.assertTrue((batch.boards.sum(axis=1) == 48).all())
+
+
+class MctsAiTests(unittest.TestCase):
+    """Tests for MctsAi"""
+
+    def test_create_player(self):
+        game = Mancala()
+        game.create_player('p1')
+        self.assertIsInstance(game.create_player(-3), MctsAi)
+
+    def test_playout_budget(self):
+        ai = MctsAi(Board(), 1, playouts=50)
+        self.assertIn(ai.choose_move(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(ai.get_playouts(), 50)
+
+    def test_time_budget(self):
+        ai = MctsAi(Board(), 1, time_limit=0.05)
+        start = time.monotonic()
+        ai.choose_move()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertGreater(ai.get_playouts(), 0)
+
+    def test_options_only_for_search_ais(self):
+        game = Mancala()
+        self.assertRaises(ValueError, game.create_player, -1, max_depth=2)
+        self.assertRaises(ValueError, game.create_player, 'p1', playouts=2)
+        self.assertEqual(game.get_player_names(), None)
+        self.assertIsInstance(game.create_player(-3, playouts=2), MctsAi)
+
+    def test_zero_budget_runs_one_playout(self):
+        for ai in (MctsAi(Board(), 1, playouts=0),
+                   MctsAi(Board(), 1, time_limit=0)):
+            self.assertIn(ai.choose_move(), [1, 2, 3, 4, 5, 6])
+            self.assertEqual(ai.get_playouts(), 1)
+
+    def test_finds_winning_capture(self):
+        # pit 1 captures 3 seeds to win 26 to 22
+        board = Board()
+        board.set_board(BoardState([0, 0, 0, 0, 3, 0, 22,
+                                    1, 0, 0, 1, 0, 0, 21]))
+        ai = MctsAi(board, 2, playouts=200)
+        self.assertEqual(ai.choose_move(), 1)
 
+    def test_tree_kept_between_moves(self):
+        random.seed(3)
+        game = Mancala()
+        game.create_player('p1')
+        ai = MctsAi(game.get_board_obj(), 2, playouts=300)
+        game._players.append(ai)
+        game.play_game(1, 1)
+        game.play_game(2, ai.choose_move())
+        while game.get_turn() == 2:
+            game.play_game(2, ai.choose_move())
+        # a reply by player 1 that was searched and does not get another turn
+        reply = max((child for child in ai.get_root().children
+                     if child.turn == 2 and not child.ended),
+                    key=lambda child: child.visits)
+        game.play_game(1, reply.move)
+        root = ai.find_root(game.get_board_obj().get_state())
+        self.assertIs(root, reply)
+        self.assertGreater(root.visits, 0)
+        self.assertIsNone(root.parent)
+
+
+class TournamentTests(unittest.TestCase):
+    """Tests for the tournament harness"""
+
+    ENTRANTS = (Entrant('easy', -1, {}),
+                Entrant('hard', -2, {'max_depth': 2, 'time_limit': None}))
+
+    def test_schedule_alternates_first_player(self):
+        games = schedule(3, 4)
+        self.assertEqual(len(games), 12)
+        self.assertEqual(games[:4], [(0, 1), (1, 0), (0, 1), (1, 0)])
+        self.assertEqual(set(games[4:8]), {(0, 2), (2, 0)})
+
+    def test_parse_entrant(self):
+        self.assertEqual(parse_entrant('hard-6=-2,max_depth=6,time_limit=None'),
+                         Entrant('hard-6', -2,
+                                 {'max_depth': 6, 'time_limit': None}))
+        self.assertEqual(parse_entrant('easy=-1'), Entrant('easy', -1, {}))
+        self.assertRaises(ValueError, parse_entrant, 'easy=-1,max_depth=2')
+
+    def test_hard_ai_files_off_by_default(self):
+        self.assertEqual(entrant_options(self.ENTRANTS[1]),
+                         {'max_depth': 2, 'time_limit': None,
+                          'endgame_path': None, 'book_path': None})
+        book = Entrant('hard', -2, {'book_path': 'opening.book'})
+        self.assertEqual(entrant_options(book)['book_path'], 'opening.book')
+        self.assertEqual(entrant_options(self.ENTRANTS[0]), {})
+        create_player = Mancala.create_player
+        with patch.object(Mancala, 'create_player', autospec=True,
+                          side_effect=create_player) as created:
+            play_tournament(self.ENTRANTS, 1, workers=0)
+        self.assertIn(((-2,), entrant_options(self.ENTRANTS[1])),
+                      [(call.args[1:], call.kwargs)
+                       for call in created.call_args_list])
+
+    def test_fit_elo(self):
+        results = ([GameResult(0, 1, 1, (0, 0), (1, 1))] * 3 +
+                   [GameResult(1, 0, 1, (0, 0), (1, 1))] +
+                   [GameResult(1, 2, 0, (0, 0), (1, 1))] * 2)
+        ratings = fit_elo(3, results)
+        self.assertAlmostEqual(sum(ratings), 0)
+        self.assertGreater(ratings[0], ratings[1])
+        self.assertAlmostEqual(ratings[1], ratings[2])
+
+    def test_play_tournament(self):
+        results, seconds = play_tournament(self.ENTRANTS, 4, workers=2)
+        self.assertEqual([(res.first, res.second) for res in results],
+                         schedule(2, 4))
+        summary = summarize(self.ENTRANTS, results, seconds)
+        self.assertEqual(summary['games'], 4)
+        easy, hard = summary['players']
+        self.assertEqual(easy['games'], 4)
+        self.assertIsNone(hard['options']['book_path'])
+        self.assertAlmostEqual(easy['score'] + hard['score'], 1)
+        self.assertLessEqual(hard['elo_interval'][0], hard['elo'])
+        self.assertGreaterEqual(hard['elo_interval'][1], hard['elo'])
+
+    def test_same_seed_same_games(self):
+        first, _ = play_tournament(self.ENTRANTS, 2, workers=0, seed=4)
+        second, _ = play_tournament(self.ENTRANTS, 2, workers=0, seed=4)
+        self.assertEqual([(res.winner, res.moves) for res in first],
+                         [(res.winner, res.moves) for res in second])
+
+    def test_no_pygame_import(self):
+        check = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, Tournament; sys.exit("pygame" in sys.modules)'],
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(check.returncode, 0)
+
+
+class BenchmarkTests(unittest.TestCase):
+    """Tests for comparing benchmark results to a baseline"""
+
+    def test_compare(self):
+        baseline = {'speed': {'value': 100.0, 'higher_is_better': True},
+                    'time': {'value': 10.0, 'higher_is_better': False}}
+        results = {'speed': {'value': 85.0, 'higher_is_better': True},
+                   'time': {'value': 13.0, 'higher_is_better': False},
+                   'new': {'value': 1.0, 'higher_is_better': True}}
+        regressions = benchmarks.compare(results, baseline, 0.2)
+        self.assertEqual([name for name, *_ in regressions], ['time'])
+        self.assertAlmostEqual(regressions[0][3], 0.3)
+        self.assertEqual(benchmarks.compare(baseline, baseline), [])
+
+    def test_no_pygame_import(self):
+        check = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, benchmarks; sys.exit("pygame" in sys.modules)'],
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(check.returncode, 0)
+
+    def test_positions_are_playable(self):
+        for positions in benchmarks.POSITIONS.values():
+            for seeds, turn in positions:
+                self.assertEqual(sum(seeds), 48)
+                self.assertTrue(get_valid_moves(BoardState(seeds), turn))
+
+
+class SearchStatsTests(unittest.TestCase):
+    """Tests for the HardAi search statistics"""
+
+    def test_choose_move_returns_stats(self):
+        ai = HardAi(Board(), 1, max_depth=4)
+        move, stats = ai.choose_move(return_stats=True)
+        self.assertEqual(stats.move, move)
+        self.assertIs(ai.get_last_stats(), stats)
+        self.assertEqual(stats.nodes, ai.get_nodes())
+        self.assertGreater(stats.leaf_evaluations, 0)
+        self.assertLessEqual(stats.leaf_evaluations, stats.nodes)
+        self.assertLessEqual(stats.first_move_cutoffs, stats.cutoffs)
+        self.assertEqual(stats.completed_depth, 4)
+        self.assertEqual(stats.max_ply, 5)
+        self.assertEqual(sorted(stats.root_move_times), [1, 2, 3, 4, 5, 6])
+        self.assertGreater(stats.effective_branching_factor(), 1)
+        self.assertIsNotNone(stats.table_hit_rate())
+
+    def test_same_move_without_stats(self):
+        random.seed(2)
+        move = HardAi(Board(), 1, max_depth=4).choose_move()
+        random.seed(2)
+        ai = HardAi(Board(), 1, max_depth=4)
+        self.assertEqual(ai.choose_move(return_stats=True)[0], move)
+        self.assertIsInstance(ai.choose_move(), int)
+
+    def test_stats_hook(self):
+        calls = []
+        ai = HardAi(Board(), 1, max_depth=3, table_size_mb=0,
+                    stats_hook=calls.append)
+        move = ai.choose_move()
+        self.assertEqual([stats.move for stats in calls], [move])
+        self.assertIsNone(calls[0].table_hit_rate())
+        ai.set_stats_hook(None)
+        ai.choose_move()
+        self.assertEqual(len(calls), 1)
+
+    def test_logging_hook(self):
+        ai = HardAi(Board(), 1, max_depth=2, stats_hook=logging_hook())
+        with self.assertLogs('SearchStats') as logs:
+            ai.choose_move()
+        self.assertIn('nodes', logs.output[0])
+
+    def test_merge(self):
+        first = SearchStats()
+        first.nodes, first.cutoffs, first.max_ply = 10, 2, 3
+        first.root_move_times = {1: 0.5}
+        second = SearchStats()
+        second.nodes, second.cutoffs, second.max_ply = 5, 1, 6
+        second.root_move_times = {1: 0.25, 2: 1.0}
+        first.merge(second)
+        self.assertEqual((first.nodes, first.cutoffs, first.max_ply),
+                         (15, 3, 6))
+        self.assertEqual(first.root_move_times, {1: 0.75, 2: 1.0})
+
+
+class OpeningBookTests(unittest.TestCase):
+    """Tests for the opening book"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'opening.book')
+        build_book(cls.path, plies=2, depth=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_book_has_best_moves(self):
+        book = OpeningBook(self.path)
+        # the start position and the 6 positions after each first move
+        self.assertEqual(len(book), 7)
+        position = Board().get_state()
+        ai = HardAi(Board(), 1, max_depth=4)
+        ai.new_search()
+        moves = [1, 2, 3, 4, 5, 6]
+        self.assertEqual(book.lookup(position, 1),
+                         best_moves(moves, ai.rate_moves(position, moves, 4)))
+        self.assertIsNone(book.lookup(position, 2))
+
+    def test_missing_file(self):
+        book = OpeningBook(os.path.join(self.directory.name, 'none'))
+        self.assertIsNone(book.lookup(Board().get_state(), 1))
+        self.assertEqual(len(book), 0)
+
+    def test_hard_ai_plays_book_moves(self):
+        book = OpeningBook(self.path)
+        ai = HardAi(Board(), 1, max_depth=4, book_path=self.path)
+        move, stats = ai.choose_move(return_stats=True)
+        self.assertIn(move, book.lookup(Board().get_state(), 1))
+        self.assertTrue(stats.book_move)
+        self.assertEqual(ai.get_nodes(), 0)
+        # searches positions not in the book
+        board = Board()
+        board.set_board(BoardState([0, 0, 0, 3, 0, 2, 22,
+                                    1, 0, 0, 1, 0, 0, 19]))
+        ai = HardAi(board, 1, max_depth=4, book_path=self.path)
+        ai.choose_move()
+        self.assertGreater(ai.get_nodes(), 0)
+
+
+class AiWorkerTests(unittest.TestCase):
+    """Tests for AiWorker"""
+
+    def wait_for_move(self, worker, seconds=10):
+        """Polls worker until it has a move or seconds pass"""
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            move = worker.poll(0.01)
+            if move is not None:
+                return move
+        self.fail('no move chosen')
+
+    def test_chooses_move(self):
+        worker = AiWorker()
+        worker.start(HardAi(Board(), 1, max_depth=2))
+        self.assertTrue(worker.is_thinking())
+        self.assertIn(self.wait_for_move(worker), [1, 2, 3, 4, 5, 6])
+        self.assertFalse(worker.is_thinking())
+        self.assertIsNone(worker.poll())
+
+    def test_cancel_hard_ai(self):
+        worker = AiWorker()
+        worker.start(HardAi(Board(), 1, time_limit=30000, max_depth=None))
+        time.sleep(0.1)
+        start = time.monotonic()
+        worker.cancel()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertFalse(worker.is_thinking())
+        self.assertIsNone(worker.poll())
+
+    def test_cancel_mcts_ai(self):
+        worker = AiWorker()
+        worker.start(MctsAi(Board(), 1, time_limit=30))
+        time.sleep(0.1)
+        start = time.monotonic()
+        worker.cancel()
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_restart_after_cancel(self):
+        worker = AiWorker()
+        ai = HardAi(Board(), 1, time_limit=30000, max_depth=None)
+        worker.start(ai)
+        worker.cancel()
+        ai = HardAi(Board(), 1, max_depth=2)
+        worker.start(ai)
+        self.assertIn(self.wait_for_move(worker), [1, 2, 3, 4, 5, 6])
+
+    def test_start_waits_for_old_search(self):
+        stopping = threading.Event()
+        finished = []
+
+        class SlowToStop:
+            """Takes longer than cancel's timeout to stop searching"""
+            def choose_move(self):
+                stopping.wait()
+                time.sleep(1.2)
+                finished.append(True)
+                raise SearchCancelled()
+
+            def request_stop(self):
+                stopping.set()
+
+            def clear_stop(self):
+                # the new search starts after the old one is done
+                self.cleared_after = list(finished)
+
+        player = SlowToStop()
+        worker = AiWorker()
+        worker.start(player)
+        worker.start(player)
+        self.assertEqual(player.cleared_after, [True])
+
+    def test_request_stop(self):
+        ai = HardAi(Board(), 1, max_depth=8)
+        ai.request_stop()
+        self.assertRaises(SearchCancelled, ai.choose_move)
+        ai.clear_stop()
+        self.assertIn(ai.choose_move(), [1, 2, 3, 4, 5, 6])
+
+    def test_errors_raised_by_poll(self):
+        ai = MagicMock()
+        ai.choose_move.side_effect = ValueError('no moves')
+        worker = AiWorker()
+        worker.start(ai)
+        worker._thread.join()
+        self.assertRaises(ValueError, worker.poll)
+
+    def test_ponder_cancelled_by_start(self):
+        game = Mancala()
+        game.create_player('p1')
+        ai = game.create_player(-2, max_depth=None, time_limit=60,
+                                endgame_path=None, book_path=None)
+        worker = AiWorker()
+        position = game.get_board_obj().get_state()
+        worker.ponder(ai, position)
+        thread = worker._thread
+        # pondering the same position again keeps the search running
+        worker.ponder(ai, position)
+        self.assertIs(worker._thread, thread)
+        self.assertTrue(worker.is_pondering())
+        self.assertFalse(worker.is_thinking())
+        self.assertIsNone(worker.poll())
+        game.play_game(1, 1)
+        start = time.monotonic()
+        worker.start(HardAi(game.get_board_obj(), 2, max_depth=2))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(worker.is_pondering())
+        self.assertIn(self.wait_for_move(worker), [1, 2, 3, 4, 5, 6])
+
+
+class EvaluationTests(unittest.TestCase):
+    """Tests for Evaluator"""
+
+    def test_features(self):
+        position = BoardState([0, 3, 0, 1, 0, 2, 10,
+                               4, 0, 5, 0, 0, 1, 12])
+        self.assertEqual(Evaluator([(STORE_DIFFERENCE, 1)]).score(position),
+                         -2)
+        self.assertEqual(Evaluator([(SEEDS_ON_SIDE, 1)]).score(position), -4)
+        self.assertEqual(Evaluator([(MOBILITY, 1)]).score(position), 0)
+        # player 1's empty pit 1 faces 1 seed, player 2's empty pit 5 faces
+        # 3 seeds, and empty pits facing empty pits threaten nothing
+        self.assertEqual(Evaluator([(CAPTURE_THREATS, 1)]).score(position),
+                         -2)
+        self.assertEqual(Evaluator([(STORE_DIFFERENCE, 2), (MOBILITY, 3),
+                                    (SEEDS_ON_SIDE, -1)]).score(position), 0)
+
+    def test_update_matches_score(self):
+        random.seed(5)
+        for name in FEATURE_SETS:
+            evaluator = Evaluator(name)
+            for _ in range(20):
+                position, turn = Board().get_state(), 1
+                score = evaluator.score(position)
+                while True:
+                    res = apply_move(position, turn, random.choice(
+                        get_valid_moves(position, turn)))
+                    score = evaluator.update(score, position, res)
+                    self.assertEqual(score, evaluator.score(res.position))
+                    if res.ended:
+                        break
+                    position, turn = res.position, res.turn
+
+    def test_hard_ai_evaluation(self):
+        board = Board()
+        board.set_board([[0, 3, 0, 1, 0, 2, 10], [4, 0, 5, 0, 0, 1, 12]])
+        self.assertEqual(HardAi(board, 2).evaluation(board), 2)
+        ai = HardAi(board, 2, features='positional')
+        self.assertEqual(
+            ai.evaluation(board),
+            -Evaluator(FEATURE_SETS['positional']).score(board.get_state()))
+        # decided games are rated by the stores whatever the features
+        board.set_board([[0, 0, 0, 0, 0, 0, 20], [0, 0, 0, 0, 0, 3, 25]])
+        self.assertEqual(ai.evaluation(board), 100)
+        self.assertIn(ai.choose_move(), [6])
+
+    def test_search_matches_full_evaluation(self):
+        # the ratings are the same as scoring every leaf from scratch
+        board = Board()
+        board.set_board([[3, 0, 7, 1, 2, 5, 8], [0, 6, 1, 3, 2, 2, 8]])
+        state = board.get_state()
+        moves = get_valid_moves(state, 2)
+        ai = HardAi(board, 2, 0, features='positional')
+        ai.new_search()
+        ratings = [ai.rate_move(state, move, 3) for move in moves]
+        with patch.object(Evaluator, 'update',
+                          lambda self, score, position, res:
+                          self.score(res.position)):
+            ai.new_search()
+            self.assertEqual([ai.rate_move(state, move, 3)
+                              for move in moves], ratings)
+
+
+@unittest.skipIf(pygame is None, 'pygame is not installed')
+class GameScreenTests(unittest.TestCase):
+    """Tests for drawing GameScreen"""
+
+    def setUp(self):
+        self.screen = pygame.display.set_mode((Gui.W_WIDTH, Gui.W_HEIGHT))
+        self.game_screen = Gui.GameScreen(self.screen)
+        self.game_screen.set_mode('HARD')
+        self.game_screen.start('p1', -2)
+
+    def full_redraw(self):
+        """Returns a copy of the screen with every hole drawn on it"""
+        expected = self.screen.copy()
+        self.game_screen.all_sprites.draw(expected)
+        return expected
+
+    def assert_screen_equal(self, expected):
+        self.assertEqual(pygame.image.tobytes(self.screen, 'RGB'),
+                         pygame.image.tobytes(expected, 'RGB'))
+
+    def play_move(self, pit, ticks=1000):
+        """
+        Plays pit for player 1 in a game shown on the game screen, with the
+        animation starting at ticks
+        """
+        game = Mancala(self.game_screen)
+        game.create_player('p1')
+        game.create_player('p2')
+        with patch('pygame.time.get_ticks', return_value=ticks):
+            game.play_game(1, pit)
+        return game
+
+    def test_update_pit_only_updates_changed_holes(self):
+        with patch('pygame.display.update') as update, \
+                patch('pygame.display.flip') as flip:
+            self.play_move(3, 0)
+            self.assertTrue(self.game_screen.is_animating())
+            update.assert_not_called()
+            for step in range(5):
+                self.game_screen.animate(step * Gui.SEED_DELAY)
+            self.assertFalse(self.game_screen.is_animating())
+        flip.assert_not_called()
+        # pit 3 is emptied, then 4, 5, 6 and the store get a seed each
+        rects = [call.args[0] for call in update.call_args_list]
+        self.assertEqual([len(r) for r in rects], [1] * 5)
+        self.assertEqual(rects[0][0],
+                         self.game_screen.get_pit(1, 3).rect)
+        self.assertEqual(rects[-1][0],
+                         self.game_screen.get_pit(1, 7).rect)
+        self.assert_screen_equal(self.full_redraw())
+
+    def test_animation_advances_by_time(self):
+        game_screen = self.game_screen
+        start = 1000
+        self.play_move(3, start)
+        # main un-highlights the pits when one is clicked
+        game_screen.get_pit(1, 4).can_select = False
+        game_screen.display_turn('p1', 1)
+        store = game_screen.get_pit(1, 7)
+        # a step every SEED_DELAY, the turn is shown after the last one
+        self.assertTrue(game_screen.animate(start))
+        self.assertEqual(game_screen.get_pit(1, 3).seeds, 0)
+        self.assertFalse(game_screen.animate(start + Gui.SEED_DELAY - 1))
+        self.assertEqual(game_screen.get_pit(1, 4).seeds, 4)
+        game_screen.animate(start + 4 * Gui.SEED_DELAY)
+        self.assertEqual(store.seeds, 1)
+        self.assertTrue(game_screen.is_animating())
+        self.assertFalse(game_screen.get_pit(1, 4).can_select)
+        game_screen.animate(start + 5 * Gui.SEED_DELAY)
+        self.assertTrue(game_screen.get_pit(1, 4).can_select)
+        self.assertFalse(game_screen.is_animating())
+
+    def test_skip_and_speed(self):
+        game_screen = self.game_screen
+        self.play_move(1)
+        game_screen.skip_animation()
+        self.assertFalse(game_screen.is_animating())
+        self.assertEqual(game_screen.get_pit(1, 5).seeds, 5)
+        self.assert_screen_equal(self.full_redraw())
+        # a faster animation
+        game_screen.reset()
+        game_screen.set_seed_delay(100)
+        self.play_move(1, 0)
+        game_screen.animate(4 * 100)
+        self.assertFalse(game_screen.is_animating())
+        # fast forward shows every step on the next frame
+        game_screen.reset()
+        game_screen.set_seed_delay(100000)
+        game_screen.set_fast_forward(True)
+        self.play_move(1)
+        self.assertTrue(game_screen.animate())
+        self.assertFalse(game_screen.is_animating())
+        end = Mock()
+        game_screen.after_animation(end, 1)
+        end.assert_called_once_with(1)
+
+    def test_display_turn_updates_turn_and_pits(self):
+        with patch('pygame.display.update') as update:
+            self.game_screen.display_turn('p1', 1)
+        # only the turn text, the pits were highlighted by start
+        update.assert_called_once_with([pygame.Rect(10, 100,
+                                                     Gui.W_WIDTH // 3, 40)])
+        self.game_screen.set_mode('TWO')
+        with patch('pygame.display.update') as update:
+            self.game_screen.display_turn('p2', 2)
+        # the 6 pits no longer highlighted, 6 highlighted and the turn text
+        self.assertEqual(len(update.call_args.args[0]), 13)
+        self.assert_screen_equal(self.full_redraw())
+
+    def test_remove_change_display(self):
+        game_screen = self.game_screen
+        game_screen.update_pit(2, 1, 1)
+        game_screen.skip_animation()
+        pit = game_screen.get_pit(2, 1)
+        game_screen.remove_change_display(pit)
+        with patch('pygame.display.update') as update:
+            game_screen.refresh()
+        update.assert_called_once_with([pit.rect])
+        self.assertEqual(game_screen.get_pits_changed(), [])
+        self.assert_screen_equal(self.full_redraw())
+
+    def test_step_animation(self):
+        self.play_move(1)
+        # 4 seeds sown then the turn shown, one step at a time
+        for _ in range(5):
+            self.assertTrue(self.game_screen.step_animation())
+        self.assertFalse(self.game_screen.step_animation())
+        self.assertFalse(self.game_screen.is_animating())
+        self.assert_screen_equal(self.full_redraw())
+
+    def test_display_thinking_only_draws_changes(self):
+        with patch('pygame.time.get_ticks', return_value=0), \
+                patch('pygame.display.update') as update:
+            self.game_screen.display_thinking('HARD AI')
+            self.game_screen.display_thinking('HARD AI')
+            self.assertEqual(update.call_count, 1)
+            self.game_screen.clear_thinking()
+            self.game_screen.display_thinking('HARD AI')
+        self.assertEqual(update.call_count, 3)
+
+    def test_fonts_and_text_are_cached(self):
+        self.assertIs(Gui.get_font(28), Gui.get_font(28))
+        self.assertIsNot(Gui.get_font(28), Gui.get_font(28, False))
+        self.assertIs(Gui.render_text('12', 38), Gui.render_text('12', 38))
+        pit = self.game_screen.get_pit(1, 1)
+        pit.change_seed_count(3)
+        self.game_screen.update(pit)
+        # drawn again with the fonts and text from the first time
+        with patch('pygame.freetype.Font') as freetype_font, \
+                patch('pygame.font.Font') as font:
+            self.game_screen.update(pit)
+            self.game_screen.display_turn('p1', 1)
+        freetype_font.assert_not_called()
+        font.assert_not_called()
+        # the same as rendering the text onto the pit
+        expected = Gui.render_hole(Gui.PIT_WIDTH, Gui.PIT_HEIGHT).copy()
+        Gui.get_font(Gui.SEED_FONT_SIZE).render_to(expected, pit.text_rect,
+                                                   '7')
+        Gui.get_font(18).render_to(expected, (0, 0), '+3')
+        pygame.draw.rect(expected, (150, 0, 0), expected.get_rect(), 6,
+                         border_radius=40)
+        self.assertEqual(pygame.image.tobytes(pit.image, 'RGB'),
+                         pygame.image.tobytes(expected, 'RGB'))
+
+
+@unittest.skipIf(pygame is None, 'pygame is not installed')
+class MainLoopTests(unittest.TestCase):
+    def setUp(self):
+        self.gui = Gui.GraphicInterface()
+        self.game = Mancala(self.gui.get_game_gui())
+        self.game.create_player('p1')
+        self.game.create_player(-2)
+
+    def clear_changes(self):
+        """Shows the last move and removes its seed count changes"""
+        game_gui = self.gui.get_game_gui()
+        game_gui.skip_animation()
+        for pit in list(game_gui.get_pits_changed()):
+            game_gui.remove_change_display(pit)
+
+    def test_needs_frames(self):
+        # nothing changes on the menus without an event
+        self.assertFalse(main.needs_frames(self.gui, self.game, 'HARD'))
+        self.gui.show_game_screen('p1', 'HARD AI')
+        self.assertFalse(main.needs_frames(self.gui, self.game, 'HARD'))
+        self.game.play_game(1, 3)
+        self.assertTrue(main.needs_frames(self.gui, self.game, 'HARD'))
+        self.gui.get_game_gui().skip_animation()
+        # the seed count changes are still showing
+        self.assertTrue(main.needs_frames(self.gui, self.game, 'HARD'))
+        self.clear_changes()
+        # player 1 moves again after landing in their store
+        self.assertFalse(main.needs_frames(self.gui, self.game, 'HARD'))
+        self.game.play_game(1, 1)
+        self.clear_changes()
+        # the Ai is choosing its move, unless there is no Ai
+        self.assertTrue(main.needs_frames(self.gui, self.game, 'HARD'))
+        self.assertFalse(main.needs_frames(self.gui, self.game, 'TWO'))
+
+    def test_check_hover_only_draws_changes(self):
+        screen = self.gui.get_screen()
+        rect = pygame.Rect(screen._buttons[0][0])
+        with patch('pygame.display.update') as update, \
+                patch('pygame.display.flip') as flip:
+            screen.check_hover((0, 0))
+            update.assert_not_called()
+            screen.check_hover(rect.center)
+            screen.check_hover((rect.centerx + 1, rect.centery))
+            update.assert_called_once_with([rect])
+            screen.check_hover((0, 0))
+            update.assert_called_with([rect])
+        self.assertEqual(update.call_count, 2)
+        flip.assert_not_called()
+        # drawn without the hover color when the screen starts again
+        screen.check_hover(rect.center)
+        screen.start()
+        with patch('pygame.display.update') as update:
+            screen.check_hover(rect.center)
+        update.assert_called_once_with([rect])
+
+    def test_get_events_waits_when_idle(self):
+        clock = Mock()
+        event = pygame.event.Event(pygame.USEREVENT)
+        with patch('pygame.event.wait', return_value=event) as wait, \
+                patch('pygame.event.get', return_value=[]) as get:
+            self.assertEqual(main.get_events(clock, 60, False), [event])
+            wait.assert_called_once_with()
+            clock.tick.assert_called_once_with()
+            clock.reset_mock()
+            # while busy it is held to the frame rate instead of waiting
+            self.assertEqual(main.get_events(clock, 60, True), [])
+            clock.tick.assert_called_once_with(60)
+            wait.assert_called_once_with()
+        self.assertEqual(get.call_count, 2)
+
+
+@unittest.skipIf(pygame is None, 'pygame is not installed')
+class ReplayTests(unittest.TestCase):
+    def test_random_moves(self):
+        moves = Replay.random_moves(3)
+        self.assertEqual(moves, Replay.random_moves(3))
+        game = Mancala()
+        game.create_player('p1')
+        game.create_player('p2')
+        for pit in moves:
+            self.assertIn(pit, game.get_board_obj().get_pits_with_seeds(
+                game.get_turn()))
+            game.play_game(game.get_turn(), pit)
+        self.assertTrue(game.get_end_state())
+
+    def test_replay_frames(self):
+        moves = Replay.random_moves(3)
+        # the start, each move and the end screen
+        frames = list(Replay.replay_frames(moves, every_seed=False))
+        self.assertEqual(len(frames), len(moves) + 2)
+        seeds = sum(1 for _ in Replay.replay_frames(moves, end_screen=False))
+        self.assertGreater(seeds, len(moves) + 1)
+        # stops at the first move that can't be played
+        with self.assertRaises(ValueError):
+            list(Replay.replay_frames([3, 3]))
+
+    def test_save_png_sequence(self):
+        moves = [3, 1]
+        with tempfile.TemporaryDirectory() as directory:
+            count = Replay.save_png_sequence(
+                Replay.replay_frames(moves, every_seed=False), directory,
+                0.25)
+            self.assertEqual(count, 3)
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['frame0000.png', 'frame0001.png',
+                              'frame0002.png'])
+            frame = pygame.image.load(os.path.join(directory,
+                                                   'frame0002.png'))
+        self.assertEqual(frame.get_size(), (Gui.W_WIDTH // 4,
+                                            Gui.W_HEIGHT // 4))
+
+    @unittest.skipIf(Replay is None or Replay.Image is None,
+                     'Pillow is not installed')
+    def test_save_gif(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replay.gif')
+            count = Replay.save_gif(
+                Replay.replay_frames([3, 1], every_seed=False), path,
+                scale=0.25)
+            with Replay.Image.open(path) as image:
+                self.assertEqual(image.n_frames, count)